@@ -0,0 +1,225 @@
+'''Benchmarks of simplex.py, to track its speed across versions.
+
+Generators make LP models in the format of LPParser: Klee-Minty
+cubes, random dense and sparse LPs, transportation and assignment
+problems, degenerate families of Beale's cycling example, and
+knapsack IPs. The runner times Tableau.solve for each pricing rule
+and BnBsolver.optimize for each strategy, and writes one record per
+run to a JSON file:
+
+> python benchmark.py [-o bench.json] [--size 2] [--engines fraction,float]
+'''
+
+import argparse, json, platform, random, time
+import tracemalloc #peak memory, in a second run as it slows the first
+import simplex
+from simplex import LPParser, Tableau, BnBsolver, Node, NullOutput
+
+
+def _lp(sense, obj, rows, extra=()):
+    'model text: obj and rows as {variable: coefficient}, rel, rhs.'
+    def terms(t):
+        return ' + '.join('%s %s' % (a, v) for v, a in t.items()
+                          ).replace('+ -', '- ')
+    lines = ['%s %s' % (sense, terms(obj)), 'st']
+    for t, rel, rhs in rows: lines.append('%s %s %s' % (terms(t), rel, rhs))
+    lines.extend(extra)
+    lines.append('end')
+    return '\n'.join(lines)
+
+def klee_minty(n):
+    '''the Klee-Minty cube: the largest sigma rule visits all of its
+2^n vertices.'''
+    obj = dict(('x%i' % j, 2**(n-j)) for j in range(1, n+1))
+    rows = []
+    for i in range(1, n+1):
+        t = dict(('x%i' % j, 2**(i-j+1)) for j in range(1, i))
+        t['x%i' % i] = 1
+        rows.append((t, '<=', 5**i))
+    return _lp('max', obj, rows)
+
+def random_lp(m, n, density=1.0, seed=0):
+    '''max c x, A x <= b with A >= 0 of the density, no zero row or
+column: feasible at 0 and bounded.'''
+    rnd = random.Random(seed)
+    obj = dict(('x%i' % j, rnd.randint(1, 9)) for j in range(1, n+1))
+    rows = [{} for i in range(m)]
+    for i, t in enumerate(rows):
+        for j in range(1, n+1):
+            if rnd.random() < density: t['x%i' % j] = rnd.randint(1, 9)
+    for j in range(1, n+1): #every column in some row
+        rows[rnd.randrange(m)].setdefault('x%i' % j, rnd.randint(1, 9))
+    for t in rows:
+        if not t: t['x%i' % rnd.randint(1, n)] = 1
+    return _lp('max', obj, [(t, '<=', rnd.randint(10, 10*n)) for t in rows])
+
+def transportation(s, d, seed=0):
+    '''s sources, d destinations: supplies as <= rows, demands as >=
+rows, which need phase I.'''
+    rnd = random.Random(seed)
+    demand = [rnd.randint(5, 30) for j in range(d)]
+    supply = [rnd.randint(5, 30) for i in range(s)]
+    supply[0] += max(0, sum(demand) - sum(supply))
+    x = lambda i, j: 'x%i' % (i*d + j + 1)
+    obj = dict((x(i, j), rnd.randint(1, 20))
+               for i in range(s) for j in range(d))
+    rows = [(dict((x(i, j), 1) for j in range(d)), '<=', supply[i])
+            for i in range(s)]
+    rows += [(dict((x(i, j), 1) for i in range(s)), '>=', demand[j])
+             for j in range(d)]
+    return _lp('min', obj, rows)
+
+def assignment(n, seed=0):
+    '''n workers to n jobs: equality rows, highly degenerate. The last
+job row is left out, it is implied by the others.'''
+    rnd = random.Random(seed)
+    x = lambda i, j: 'x%i' % (i*n + j + 1)
+    obj = dict((x(i, j), rnd.randint(1, 20))
+               for i in range(n) for j in range(n))
+    rows = [(dict((x(i, j), 1) for j in range(n)), '=', 1) for i in range(n)]
+    rows += [(dict((x(i, j), 1) for i in range(n)), '=', 1)
+             for j in range(n-1)]
+    return _lp('min', obj, rows)
+
+def beale(k):
+    '''k copies of Beale's cycling example side by side, see exlp[5]:
+degenerate at 0, the largest sigma rule cycles without an anti-cycling
+rule, see Tableau.lexicographic.'''
+    obj, rows = {}, []
+    for b in range(k):
+        x = lambda j: 'x%i' % (4*b + j)
+        obj.update({x(1): '3/4', x(2): -150, x(3): '1/50', x(4): -6})
+        rows.append(({x(1): '1/4', x(2): -60, x(3): '-1/25', x(4): 9},
+                     '<=', 0))
+        rows.append(({x(1): '1/2', x(2): -90, x(3): '-1/50', x(4): 3},
+                     '<=', 0))
+        rows.append(({x(3): 1}, '<=', 1))
+    return _lp('max', obj, rows)
+
+def knapsack(n, seed=0):
+    'max v x, w x <= W with x binary, W half of the weights.'
+    rnd = random.Random(seed)
+    w = dict(('x%i' % j, rnd.randint(5, 40)) for j in range(1, n+1))
+    v = dict((x, a + rnd.randint(-4, 10)) for x, a in w.items())
+    return _lp('max', v, [(w, '<=', sum(w.values())//2)],
+               ['bin: ' + ', '.join(sorted(w, key=lambda x: int(x[1:])))])
+
+def suite(size=1):
+    '(name, model text) of the benchmark, size scales the models.'
+    return [('klee_minty_%i' % (4+size), klee_minty(4+size)),
+            ('dense_%ix%i' % (10*size, 10*size),
+             random_lp(10*size, 10*size, 1.0, seed=size)),
+            ('sparse_%ix%i' % (20*size, 30*size),
+             random_lp(20*size, 30*size, 0.1, seed=size)),
+            ('transportation_%ix%i' % (3*size, 4*size),
+             transportation(3*size, 4*size, seed=size)),
+            ('assignment_%i' % (3*size), assignment(3*size, seed=size)),
+            ('beale_%i' % (2*size), beale(2*size)),
+            ('knapsack_%i' % (6*size), knapsack(6*size, seed=size))]
+
+
+def _count(hist):
+    'pivots and bound flips of a history, without the end marks.'
+    pivots = flips = 0
+    for vout, vin in hist:
+        if not vin: continue
+        if vout == vin: flips += 1
+        else: pivots += 1
+    return pivots, flips
+
+def _measure(solve):
+    '''(seconds, peak memory in KB, result) of solve(): timed first,
+then run again with tracemalloc for the peak.'''
+    start = time.perf_counter()
+    result = solve()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        solve()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak//1024, result
+
+status = {1: 'infeasible', 2: 'optimal', 3: 'unbounded'}
+
+def run_lp(name, text, engine, meth):
+    'record of Tableau.solve on the model with the pricing rule.'
+    prob = LPParser(text, out=NullOutput())
+    def solve():
+        tab = Tableau(prob, False, engine, out=NullOutput())
+        tab.meth = meth
+        tab.solve(save=False)
+        return tab
+    seconds, peak, tab = _measure(solve)
+    pivots, flips = _count(getattr(tab, 'hist_I', []) + tab.hist)
+    return dict(model=name, kind='lp', engine=engine, meth=meth,
+                status=status.get(tab.phase, 'iteration limit'),
+                objective=str(tab.getObj()) if tab.phase == 2 else None,
+                iterations=pivots+flips, pivots=pivots, flips=flips,
+                seconds=seconds, pivots_per_sec=pivots/seconds if seconds
+                else None, peak_kb=peak)
+
+def run_ip(name, text, strategy, meth):
+    'record of BnBsolver.optimize on the model.'
+    prob = LPParser(text, out=NullOutput())
+    def solve():
+        bnb = BnBsolver(prob, NullOutput())
+        return bnb, bnb.optimize(strategy)
+    Node.meth = meth
+    try:
+        seconds, peak, (bnb, best) = _measure(solve)
+    finally:
+        Node.meth = 'largest_sigma'
+    return dict(model=name, kind='ip', engine='fraction', meth=meth,
+                strategy=strategy, status='optimal' if best else
+                'infeasible', objective=str(best.soln[0][1]) if best
+                else None, nodes=len(bnb.nodes), seconds=seconds,
+                nodes_per_sec=len(bnb.nodes)/seconds if seconds else None,
+                peak_kb=peak)
+
+meths = [m for m in Tableau.method_names if m != 'user_choice']
+
+def run(cases, engines=('fraction',), meths=meths,
+        strategies=BnBsolver.strategies, out=NullOutput()):
+    'records of all runs, each one reported to out as it is done.'
+    records = []
+    for name, text in cases:
+        ip = bool(LPParser(text, out=NullOutput()).intvars)
+        for meth in meths:
+            if ip:
+                runs = [lambda s=s: run_ip(name, text, s, meth)
+                        for s in strategies]
+            else:
+                runs = [lambda e=e: run_lp(name, text, e, meth)
+                        for e in engines]
+            for r in runs:
+                rec = r()
+                run = rec['engine'] #and the strategy of branch & bound
+                if 'strategy' in rec: run += '/' + rec['strategy']
+                out("%s\t%s\t%s\t%s\t%.4fs" % (rec['model'], run,
+                    rec['meth'], rec['status'], rec['seconds']))
+                records.append(rec)
+    return records
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', default='bench_output.json',
+                        help='JSON file of the results')
+    parser.add_argument('--size', type=int, default=1,
+                        help='scale of the generated models')
+    parser.add_argument('--engines', default='fraction',
+                        help='comma separated, see Tableau.engines')
+    args = parser.parse_args(argv)
+    records = run(suite(args.size), args.engines.split(','),
+                  out=simplex.Output())
+    result = dict(python=platform.python_version(),
+                  platform=platform.platform(), size=args.size,
+                  time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                  results=records)
+    with open(args.output, 'w') as f:
+        json.dump(result, f, indent=1)
+    simplex.puts("saved to file: %s" % args.output)
+
+if __name__ == '__main__':
+    main()
@@ -41,7 +41,24 @@ It might also work on older versions of Python.
 
 
 from fractions import Fraction as fract
+from copy import copy
+from heapq import heappush, heappop, heapify #for BnBsolver.optimize
+try: #for the integer engine
+    from math import gcd
+except ImportError: #Python 2
+    from fractions import gcd
 import re #regular expression
+import os, hashlib, marshal, tempfile #for ModelCache
+import csv #for TableWriter
+from xml.sax.saxutils import escape #for SpreadsheetWriter
+try: #for Probe
+    from time import perf_counter as clock
+except ImportError: #Python 2
+    from time import time as clock
+try: #optional, only needed by the float engine
+    import numpy
+except ImportError:
+    numpy = None
 
 import sys #for emulating Python 3 print
 def puts(*args, **kwargs): #used in Python 2
@@ -60,16 +77,233 @@ def puts(*args, **kwargs): #used in Python 2
     finally:
         if redirect: sys.stdout = redirect
 
-if 'raw_input' in dir(__builtins__):
+try:
     input = raw_input
-else: #Python 3+
-    puts = getattr(__builtins__, 'print')
-
+except NameError: #Python 3+
+    import builtins
+    puts = getattr(builtins, 'print')
+
+class Output(object):
+    '''output sink, called like print. It writes to file, or to
+sys.stdout at the time of the call if file is None.
+Tableau, BnBsolver and LPParser take one as "out".'''
+    def __init__(self, file=None):
+        self.file = file
+
+    def __call__(self, *args, **kwargs):
+        kwargs['file'] = self.file or sys.stdout
+        puts(*args, **kwargs)
+
+class NullOutput(object):
+    '''output sink that drops everything. It is false, so output
+that costs time to format may be skipped: "if self.out: ..."'''
+    def __call__(self, *args, **kwargs): pass
+    def __bool__(self): return False
+    __nonzero__ = __bool__ #Python 2
+
+class TableWriter(object):
+    '''output sink that writes each line as a row of a CSV file, the
+cells split at tabs; sep="\\t" gives TSV. As Tableau.export it is also
+given each tableau while the solve goes on, see Tableau.write.'''
+    def __init__(self, file, sep=','):
+        self.writer = csv.writer(file, delimiter=sep, lineterminator='\n')
+
+    def __call__(self, *args, **kwargs):
+        text = kwargs.get('sep', ' ').join(str(a) for a in args)
+        for line in text.split('\n'): self.row(line.split('\t'))
+
+    def row(self, cells):
+        self.writer.writerow(cells)
+
+    def table(self, rows):
+        for cells in rows: self.row(cells)
+        self.row([]) #a blank row after each tableau
+
+    def close(self):
+        'the end of the output, the file is left open.'
+
+class TableBuffer(TableWriter):
+    '''TableWriter that keeps the rows in memory, to be written to
+another one later by write_to. As Tableau.export of an interactive
+solve it keeps every tableau until the work is saved.'''
+    def __init__(self):
+        self.rows = []
+
+    def row(self, cells):
+        self.rows.append(list(cells))
+
+    def write_to(self, writer):
+        for cells in self.rows: writer.row(cells)
+
+class SpreadsheetWriter(TableWriter):
+    '''TableWriter of a SpreadsheetML (Excel 2003 XML) worksheet:
+numbers are typed, a fraction is kept as a formula like =1/3.'''
+    def __init__(self, file, sheet='simplex'):
+        self.file = file
+        file.write('<?xml version="1.0"?>\n'
+                   '<?mso-application progid="Excel.Sheet"?>\n'
+                   '<Workbook xmlns="urn:schemas-microsoft-com:office:'
+                   'spreadsheet"\n xmlns:ss="urn:schemas-microsoft-com:'
+                   'office:spreadsheet">\n<Worksheet ss:Name="%s"><Table>\n'
+                   % escape(sheet, {'"': '&quot;'}))
+
+    @staticmethod
+    def _cell(v):
+        v = str(v).strip()
+        if not v: return '<Cell/>'
+        try: f = fract(v)
+        except ValueError:
+            return '<Cell><Data ss:Type="String">%s</Data></Cell>' % escape(v)
+        if f.denominator == 1 or '/' not in v:
+            return '<Cell><Data ss:Type="Number">%s</Data></Cell>' % v
+        return ('<Cell ss:Formula="=%s"><Data ss:Type="Number">%r</Data>'
+                '</Cell>' % (v, float(f)))
+
+    def row(self, cells):
+        self.file.write('<Row>%s</Row>\n' % ''.join(map(self._cell, cells)))
+
+    def close(self):
+        self.file.write('</Table></Worksheet></Workbook>\n')
+
+
+class Probe(object):
+    '''instrumentation of the solves: tab.probe = Probe(), or
+BnBsolver(prob, probe=Probe()) for all the nodes, then probe.stats()
+(or tab.stats) gives what was collected. Without a probe (None)
+the loops only test for it.
+Timers, in seconds: pricing (choosing the column), ratio (the ratio
+test, bound flips included), pivot (the row elimination), nodes (the
+solves of branch & bound nodes), and the time of each phase.
+Counters: iterations, pivots, degenerate (pivots of a zero step),
+flips (bound flips), ties (more than one row of the min ratio),
+restores (out of wolf randomization), and nodes, pruned and
+incumbents of branch & bound.
+bits: keep the largest bit lengths of the numerators and the
+denominators, a pass over the tableau after each iteration.
+keep: keep a record of each iteration in log, see pivot.
+Hooks, see on: "iteration" f(tab, record), "phase" f(tab, record),
+"restore" f(tab), "node" f(node, seconds).'''
+    events = ('iteration', 'phase', 'restore', 'node')
+
+    def __init__(self, bits=False, keep=True):
+        self.bits, self.keep = bits, keep
+        self.hooks = dict((e, []) for e in self.events)
+        self.reset()
+
+    def reset(self):
+        'forget what was collected, the hooks stay.'
+        self.counters = dict.fromkeys(('iterations', 'pivots',
+            'degenerate', 'flips', 'ties', 'restores', 'nodes', 'pruned',
+            'incumbents'), 0)
+        self.timers = dict.fromkeys(('pricing', 'ratio', 'pivot',
+                                     'nodes'), 0.0)
+        self.phases = [] #a record of each phase
+        self.log = [] #a record of each iteration, if keep
+        self.max_bits = None #(numerator, denominator), if bits
+        self.phase = self.record = None #the ones going on
+
+    def on(self, event, f):
+        'call f on the event, see Probe.'
+        if event not in self.hooks:
+            raise ValueError("unknown event: "+event)
+        self.hooks[event].append(f)
+
+    def _fire(self, event, *args):
+        for f in self.hooks[event]: f(*args)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def begin_phase(self, tab, name):
+        self.phase = dict(phase=name, iterations=0, start=clock())
+
+    def end_phase(self, tab):
+        rec, self.phase = self.phase, None
+        rec['seconds'] = clock() - rec.pop('start')
+        rec['status'] = tab.phase
+        self.phases.append(rec)
+        self._fire('phase', tab, rec)
+
+    def pivot_element(self, tab):
+        'tab._pivot_element, with pricing and ratio test timed.'
+        start = clock()
+        c = tab._method(tab)
+        t = clock()
+        self.timers['pricing'] += t - start
+        if type(c) is not int: return c #user choice
+        r = tab._ratio_test(c) if c else 0
+        ratio = clock() - t
+        self.timers['ratio'] += ratio
+        self.record = dict(row=r, col=c, pricing=t-start, ratio=ratio,
+                           tie=r > 0 and self._tie(tab, r, c))
+        return r, c
 
-puts('''
-Welcome to simplex tableaux!
-To abort ANYTIME, use "ctrl+C".
-''')
+    @staticmethod
+    def _tie(tab, r, c):
+        'if rows other than r have the min ratio too.'
+        rows, tol = tab.rows, tab.feas_tol
+        theta = rows[r][0]/rows[r][c]
+        n = 0
+        for i in range(1, tab.m+1):
+            a = rows[i][c]
+            if a > tol and abs(rows[i][0] - theta*a) <= tol: n += 1
+        return n > 1
+
+    def pivot(self, tab, r, c):
+        '''tab._pivot(r, c), timed; r<0: x[c] went to its upper
+bound, no pivot. The record of the iteration has its row and col,
+the seconds of pricing, ratio and pivot, tie, degenerate, the phase,
+and bits if kept.'''
+        rec = self.record or dict(row=r, col=c, tie=False)
+        self.record = None
+        rec['degenerate'] = r > 0 and abs(tab.rows[r][0]) <= tab.feas_tol
+        start = clock()
+        if r > 0: tab._pivot(r, c)
+        rec['pivot'] = clock() - start
+        self.timers['pivot'] += rec['pivot']
+        self.count('iterations')
+        self.count('pivots' if r > 0 else 'flips')
+        if rec['degenerate']: self.count('degenerate')
+        if rec['tie']: self.count('ties')
+        if self.phase:
+            self.phase['iterations'] += 1
+            rec['phase'] = self.phase['phase']
+        if self.bits:
+            rec['bits'] = bits = self.bit_lengths(tab._entries())
+            if bits and self.max_bits:
+                bits = tuple(map(max, bits, self.max_bits))
+            self.max_bits = bits
+        if self.keep: self.log.append(rec)
+        self._fire('iteration', tab, rec)
+
+    @staticmethod
+    def bit_lengths(values):
+        '(numerator, denominator) largest bit lengths, None for floats.'
+        n = d = 0
+        for v in values:
+            try:
+                n = max(n, v.numerator.bit_length())
+                d = max(d, v.denominator.bit_length())
+            except AttributeError: return None #not exact
+        return n, d
+
+    def restore(self, tab):
+        self.count('restores')
+        self._fire('restore', tab)
+
+    def node(self, node, seconds):
+        self.count('nodes')
+        self.timers['nodes'] += seconds
+        self._fire('node', node, seconds)
+
+    def stats(self):
+        'what was collected, as a dict.'
+        stats = dict(self.counters)
+        stats.update(('%s_seconds'%k, v) for k, v in self.timers.items())
+        stats['phases'] = [dict(p) for p in self.phases]
+        if self.keep: stats['log'] = [dict(r) for r in self.log]
+        if self.bits: stats['max_bits'] = self.max_bits
+        return stats
 
 
 class LPParser:
@@ -86,34 +320,37 @@ The grammar is case INsensitive.
 7. a plain constraint may have a name, like "labor)".
 8. variables are non-negative by default.
 9. variables can be special kind: "free", "int", "bin"
-10. model must end with a line with just "end".
+10. "bounds:" gives simple bounds, like: x <= 4, 1 <= y <= 3
+11. model must end with a line with just "end".
 
 max 6x + 4y #comment runs to the end of line
 st #constraints starts here
     6x + 8y  <= 12
     10x+ 5y  <= 10
 	free: y #y is free variable
+	bounds: x <= 3/2 #not a constraint row
 end #end model.
 
 Please see below for more examples.
 '''
-    def __init__(self, lines=()):
+    def __init__(self, lines=(), out=None):
+        self.out = Output() if out is None else out
         self.sts = [] #constraints
         self.intvars = [] #integral variables
         self.fvs = None #free variables
+        self.intset, self.fvset = set(), set() #to look them up
+        self.bounds = {} #var: [lower, upper], upper may be None
         if type(lines) is str:
             lines = lines.split('\n')
-        for line in lines:
+        for line in lines: #read lazily, a file is never loaded whole
             if self.parseLine(line): break
         else:
             if self.sts:
-                puts("Warning: no END line.")
-        self.vars = []
+                self.out("Warning: no END line.")
+        seen = set(self.bounds) #a bounded variable is kept, if in no row
         for t,r,b,p in self.sts:
-            for v in t:
-                if v not in self.vars:
-                    self.vars.append(v)
-        self.vars = self.sortvars(self.vars)
+            seen.update(t)
+        self.vars = self.sortvars(list(seen))
 
     relsigns = {'>=':-1, '>':-1, '==':0, '=':0, '<=':1, '<':1}
     recogrels = re.compile('>=|<=|==|=|<|>')
@@ -127,7 +364,7 @@ Please see below for more examples.
             termvars = self.sortvars([v for v in td])
             terms = []
             for i, v in enumerate(termvars):
-                c = td[v]
+                c = str(td[v]) #Fractions if compiled
                 if c == '1' or c == '-1': c = c[:-1]
                 if i==0 or c.startswith('-'):
                     terms.append(' %s %s'%(c,v))
@@ -138,15 +375,23 @@ Please see below for more examples.
         lines = [obj, 'Subject To']
         for i, (t,r,b,p) in enumerate(self.sts):
             if i==0: continue #ignore objective
-            lines.append(p+maketerms(t)+ self.sign2rel[r]+ b)
+            lines.append(p+maketerms(t)+ self.sign2rel[r]+ str(b))
         if self.fvs: lines.append("free: "+', '.join(self.fvs))
         if self.intvars: lines.append("int: "+', '.join(self.intvars))
+        bounds = []
+        for v in self.sortvars(list(self.bounds)):
+            l, u = self.bounds[v]
+            if u is None: bounds.append('%s >= %s'%(v, l))
+            elif l == u: bounds.append('%s = %s'%(v, l))
+            elif l is None: bounds.append('%s <= %s'%(v, u))
+            else: bounds.append('%s <= %s <= %s'%(l, v, u))
+        if bounds: lines.append("bounds: "+', '.join(bounds))
         lines.append('End')
         return '\n'.join(lines)
     
     def parseLine(self, line):
         if line.startswith('##'):
-            return puts(line[2:]) #full comment
+            return self.out(line[2:]) #full comment
         comment = line.find('#')
         if comment>=0: line = line[:comment]
         iconstr = line.find(')') #to name constraints
@@ -171,23 +416,29 @@ Please see below for more examples.
             for name in line[5:].split(','):
                 name = name.strip()
                 assert self.recogvar.match(name), "Illigal var: "+name
-                assert name not in self.intvars, "Both INT and FREE:"+name
-                if name not in self.fvs: self.fvs.append(name)
+                assert name not in self.bounds, "Both FREE and bounded:"+name
+                if name not in self.fvset:
+                    self.fvs.append(name)
+                    self.fvset.add(name)
         elif line.startswith('INT:'): #integral variables
             for name in line[4:].split(','):
                 name = name.strip()
                 assert self.recogvar.match(name), "Illigal var: "+name
-                assert name not in self.fvs, "Both INT and FREE:"+name
-                if name not in self.intvars: self.intvars.append(name)
+                if name not in self.intset:
+                    self.intvars.append(name)
+                    self.intset.add(name)
         elif line.startswith('BIN:'): #binary variables
             for name in line[4:].split(','):
                 name = name.strip()
                 assert self.recogvar.match(name), "Illigal var: "+name
-                assert name not in self.fvs, "Both BIN and FREE:"+name
-                assert name not in self.intvars, "Already integral: "+name
+                assert name not in self.fvset, "Both BIN and FREE:"+name
+                assert name not in self.intset, "Already integral: "+name
                 self.intvars.append(name)
-                self.sts.append(({name:'1'}, self.relsigns['<'], 
-						'1', '%s]'%name))
+                self.intset.add(name)
+                self.setbound(name, 0, 1)
+        elif line.startswith('BOUNDS:'): #simple bounds
+            for bound in line[7:].split(','):
+                self.parseBound(bound)
         else: #parse a constraint
             segs = [s.strip() for s in self.recogrels.split(line)]
             assert len(segs)==2, "Must have exactly one comparison!"
@@ -197,6 +448,37 @@ Please see below for more examples.
             terms = self.parseTerms(segs[0])
             self.sts.append((terms, self.relsigns[rels], segs[1], coname))
 
+    def parseBound(self, bound):
+        'x <= 4, x >= 1, x = 2, 1 <= x <= 3 or 4 >= x, see "bounds:".'
+        bound = bound.strip()
+        segs = [s.strip() for s in self.recogrels.split(bound)]
+        rels = [self.relsigns[r] for r in self.recogrels.findall(bound)]
+        if len(segs) == 2 and self.recogvar.match(segs[0]):
+            name, nums = segs[0], [(segs[1], rels[0])]
+        elif len(segs) == 2: #number first
+            name, nums = segs[1], [(segs[0], -rels[0])]
+        else:
+            assert len(segs) == 3 and rels[0] == rels[1] != 0,\
+                   "Illegal bound: "+bound
+            name, nums = segs[1], [(segs[0], -rels[0]), (segs[2], rels[1])]
+        assert self.recogvar.match(name), "Illigal var: "+name
+        assert name not in self.fvset, "Both FREE and bounded:"+name
+        for num, r in nums: #name r num
+            assert self.recognum.match(num), 'illegal number: '+num
+            self.setbound(name, num if r <= 0 else None,
+                          num if r >= 0 else None)
+
+    def setbound(self, name, lower=None, upper=None):
+        '''tighten the bounds of a variable, they add up.
+None: not given, the lower bound is then 0.'''
+        l, u = self.bounds.get(name, (None, None))
+        if lower is not None:
+            l = fract(lower) if l is None else max(l, fract(lower))
+        if upper is not None:
+            u = fract(upper) if u is None else min(u, fract(upper))
+        assert u is None or (l or 0) <= u, "Empty bounds: "+name
+        self.bounds[name] = [l, u]
+
     recogvar = re.compile('[a-zA-Z][a-zA-Z0-9]*$')
     recognum = re.compile('^[+-]?(?:(?:0|[1-9][0-9]*)(?:/[1-9][0-9]*|[.][0-9]*)?|[.][0-9]+)$')
     
@@ -225,30 +507,273 @@ Please see below for more examples.
         return signedterms
 
     varindex = re.compile('[0-9]+$')
-    leading0s = re.compile('^0+')
 
     def sortvars(self, varnames):
-        varnames.sort(reverse=True)
-        for i, v in enumerate(varnames):
-            m = self.varindex.search(v)
-            if m:
-                idx = v[m.start():]
-                v=v[int(v.startswith('!')):m.start()]
-                m = self.leading0s.search(idx)
-                if m: idx = idx[m.end():]
-                idx = int(idx)
-            else:
-                idx = -1
-                if v.startswith('!'): v = v[1:]
-            varnames[i] = (varnames[i], v, idx)
-        varnames.sort(key=lambda t: t[2])
-        varnames.sort(key=lambda t: t[1])
-        return [t[0] for t in varnames]
-
-    def solver(self):
+        'by name, then index; x before !x and x01 before x1.'
+        varnames.sort(reverse=True) #ties are kept by the next sort
+        varnames.sort(key=self.varkey)
+        return varnames
+
+    def varkey(self, v):
+        'sort key of a variable: name and index, !x as x.'
+        s = int(v.startswith('!'))
+        m = self.varindex.search(v)
+        if not m: return v[s:], -1
+        return v[s:m.start()], int(m.group())
+
+    def solver(self, presolve=False):
+        'presolve: reduce the model first, see Presolve.'
         if self.intvars:
-            return BnBsolver(self)
-        return Tableau(self)
+            return BnBsolver(self, self.out)
+        if presolve: return Presolve(self, out=self.out)
+        return Tableau(self, out=self.out)
+
+    def compile(self):
+        '''the model in ints and strings only, for marshal. Each
+distinct number is kept once as (numerator, denominator), a row
+has the indexes of its columns and of their numbers.
+See fromcompiled and ModelCache.'''
+        col = dict((v, j) for j, v in enumerate(self.vars))
+        values, index, seen = [], {}, {} #seen: by the text
+        def k(c):
+            if c in seen: return seen[c]
+            f = fract(c)
+            nd = f.numerator, f.denominator
+            if nd not in index:
+                index[nd] = len(values)
+                values.append(nd)
+            seen[c] = index[nd]
+            return seen[c]
+        sts = [([col[v] for v in t], [k(c) for c in t.values()], r, k(b), p)
+               for t, r, b, p in self.sts]
+        bounds = [(v, None if l is None else k(l), None if u is None else k(u))
+                  for v, (l, u) in self.bounds.items()]
+        return (list(self.vars), values, sts, list(self.fvs or []),
+                list(self.intvars), bounds)
+
+    @classmethod
+    def fromcompiled(cls, data, out=None):
+        'the model of compile(), with Fractions instead of strings.'
+        prob = cls(out=out)
+        names, values, sts, fvs, intvars, bounds = data
+        fs = [fract(n, d) for n, d in values] #shared, they are immutable
+        def f(k): return None if k is None else fs[k]
+        prob.vars = list(names)
+        prob.sts = [(dict(zip(map(names.__getitem__, js),
+                              map(fs.__getitem__, ks))), r, fs[b], p)
+                    for js, ks, r, b, p in sts]
+        prob.fvs, prob.intvars = list(fvs), list(intvars)
+        prob.fvset, prob.intset = set(fvs), set(intvars)
+        prob.bounds = dict((v, [f(l), f(u)]) for v, l, u in bounds)
+        return prob
+
+    def writeMPS(self, f, fixed=False, name=''):
+        '''write the model to file f in MPS, free or fixed format.
+Rows are named by their labels, or R1, R2, ... if not labeled.
+Numbers are written as decimals, so 1/3 is rounded.'''
+        def num(c):
+            if type(c) is str and '/' not in c and \
+               (not fixed or len(c) <= 12): return c #decimal already
+            c = fract(c)
+            if c.denominator == 1: return str(c.numerator)
+            s = repr(float(c))
+            for p in range(12, 0, -1): #fixed: in 12 columns
+                if not fixed or len(s) <= 12: break
+                s = '%.*g'%(p, float(c))
+            return s
+        def line(*fields): #fields 2 to 6
+            if not fixed: return '    '+' '.join(fields)+'\n'
+            s = ''
+            for k, v in enumerate(fields):
+                if k in (2, 4): v = v.rjust(12) #numbers
+                elif len(v) > 8: raise ValueError("Name too long: "+v)
+                s = s.ljust((4, 14, 24, 39, 49)[k]) + v
+            return s+'\n'
+        names = [p[:-1].strip() if p else 'R%i'%i if i else 'OBJ'
+                 for i, (t,r,b,p) in enumerate(self.sts)]
+        cols = dict((v, []) for v in self.vars) #column-wise
+        for i, (t,r,b,p) in enumerate(self.sts):
+            for v, c in t.items(): cols[v].append((names[i], num(c)))
+        f.write('NAME          %s\n'%name)
+        if self.sts[0][1] > 0: f.write('OBJSENSE\n    MAX\n')
+        f.write('ROWS\n N  %s\n'%names[0])
+        for i, (t,r,b,p) in enumerate(self.sts):
+            if i: f.write(' %s  %s\n'%('ELG'[r], names[i])) #r: 0, 1, -1
+        f.write('COLUMNS\n')
+        marked = False #INTORG written
+        for v in self.vars:
+            if (v in self.intset) != marked:
+                marked = not marked
+                f.write("    MARKER                 'MARKER'                 "
+                        "%s\n"%("'INTORG'" if marked else "'INTEND'"))
+            col = cols[v]
+            for k in range(0, len(col), 2):
+                f.write(line(v, *(col[k] + col[k+1] if k+1 < len(col)
+                                  else col[k])))
+        if marked:
+            f.write("    MARKER                 'MARKER'                 "
+                    "'INTEND'\n")
+        f.write('RHS\n')
+        for i, (t,r,b,p) in enumerate(self.sts):
+            if i and fract(b): f.write(line('RHS', names[i], num(b)))
+        f.write('BOUNDS\n')
+        for v in self.vars:
+            if v in self.fvset: f.write(' FR'+line('BND', v)[3:])
+            if v not in self.bounds: continue
+            l, u = self.bounds[v]
+            if l is not None and l == u:
+                f.write(' FX'+line('BND', v, num(l))[3:])
+                continue
+            if l or u is not None and u < 0: #MPS: UP < 0 makes LO -inf
+                f.write(' LO'+line('BND', v, num(l or 0))[3:])
+            if u is not None: f.write(' UP'+line('BND', v, num(u))[3:])
+        f.write('ENDATA\n')
+
+class MPSParser(LPParser):
+    '''a model in MPS, free format (fields split by blanks) or fixed
+format (fields in columns 2-3, 5-12, 15-22, 25-36, 40-47, 50-61).
+It is read line by line into the structures of LPParser.
+Sections: NAME, OBJSENSE, ROWS, COLUMNS (INTORG/INTEND markers
+for integers), RHS, RANGES, BOUNDS, ENDATA. The first N row is
+the objective (minimized unless OBJSENSE says MAX), other N rows
+are dropped. A ranged row becomes two constraints. Names are kept
+as they are, rows are labeled like "COST)".'''
+    fields = ((1, 3), (4, 12), (14, 22), (24, 36), (39, 47), (49, 61))
+    rowtypes = {'N': None, 'L': 1, 'G': -1, 'E': 0}
+
+    def __init__(self, lines=(), fixed=False, out=None):
+        self.out = Output() if out is None else out
+        #constraints, [terms, rel, rhs, label] for now
+        self.sts = [[{}, -1, 0, '']] #the objective
+        self.intvars, self.fvs = [], []
+        self.intset, self.fvset = set(), set()
+        self.bounds = {}
+        self.name = ''
+        if type(lines) is str:
+            lines = lines.split('\n')
+        minf = set() #lower bound -inf, see mpsBound
+        rows, ranges = {}, {} #row name -> index into sts, range
+        dropped = set() #N rows besides the objective
+        section, sense, integral, objective = None, -1, False, None
+        for line in lines:
+            if not line.strip() or line.startswith('*'): continue
+            if fixed and line[0].isspace(): #names may have blanks
+                fs = [line[a:b].strip() for a, b in self.fields]
+                fs = [f for f in fs if f]
+            else: fs = line.split()
+            if not line[0].isspace(): #section header
+                section = fs[0].upper()
+                if section == 'NAME': self.name = ' '.join(fs[1:])
+                elif section == 'ENDATA': break
+                elif section == 'OBJSENSE' and len(fs) > 1:
+                    sense = 1 if fs[1].upper().startswith('MAX') else -1
+                continue
+            if section == 'OBJSENSE':
+                sense = 1 if fs[0].upper().startswith('MAX') else -1
+            elif section == 'ROWS':
+                rel = self.rowtypes[fs[0].upper()]
+                if rel is None and objective: dropped.add(fs[1])
+                elif rel is None:
+                    objective, rows[fs[1]] = fs[1], 0
+                    self.sts[0][3] = fs[1]+')'
+                else:
+                    rows[fs[1]] = len(self.sts)
+                    self.sts.append([{}, rel, '0', fs[1]+')'])
+            elif section == 'COLUMNS':
+                if len(fs) > 2 and fs[1] == "'MARKER'":
+                    integral = fs[2] == "'INTORG'"
+                    continue
+                v = fs[0]
+                if integral and v not in self.intset:
+                    self.intvars.append(v)
+                    self.intset.add(v)
+                for k in range(1, len(fs)-1, 2):
+                    if fs[k] in dropped: continue
+                    self.sts[rows[fs[k]]][0][v] = fs[k+1]
+            elif section in ('RHS', 'RANGES'):
+                for k in range(len(fs)%2, len(fs)-1, 2): #set name optional
+                    i = rows.get(fs[k])
+                    if i is None: continue #dropped N row
+                    if section == 'RANGES': ranges[i] = fs[k+1]
+                    elif i: self.sts[i][2] = fs[k+1]
+                    else: self.out("Warning: objective constant ignored.")
+            elif section == 'BOUNDS':
+                self.mpsBound(fs[0].upper(), fs[-2], fs[-1], minf)
+            else: raise ValueError("Unknown MPS section: %s"%section)
+        self.sts[0][1] = sense
+        for i, r in ranges.items(): #lower <= row <= upper
+            t, rel, b, p = self.sts[i]
+            r, b = fract(r), fract(b)
+            if rel == 0: rel = -1 if r > 0 else 1
+            self.sts[i] = [t, rel, str(b), p]
+            self.sts.append([t, -rel, str(b-rel*abs(r)), p[:-1]+'~)'])
+        for v, (l, u) in self.bounds.items(): #as usual, lower bound 0
+            if l is None and u is not None and u < 0 and v not in minf:
+                self.out("Warning: UP < 0 of %s, lower bound -inf."%v)
+                minf.add(v) #is taken as -inf
+        for v in sorted(minf): #free, an upper bound as a row
+            l, u = self.bounds.pop(v)
+            self.fvs.append(v)
+            self.fvset.add(v)
+            if u is not None: self.sts.append([{v: '1'}, 1, str(u), v+'~UP)'])
+        self.sts = [tuple(st) for st in self.sts]
+        for v in [v for v, lu in self.bounds.items() if lu == [None, None]]:
+            del self.bounds[v] #PL only
+        for v, (l, u) in self.bounds.items():
+            assert u is None or (l or 0) <= u, "Empty bounds: "+v
+        seen = set(self.bounds) #a bounded variable is kept, if in no row
+        for t,r,b,p in self.sts:
+            seen.update(t)
+        self.vars = self.sortvars(list(seen))
+
+    def mpsBound(self, kind, v, num, minf):
+        '''a line in BOUNDS: a value is replaced, not tightened.
+minf: the variables of lower bound -inf (MI, FR), made free when
+all is read.'''
+        if kind in ('FR', 'MI', 'PL', 'BV'): v = num #no value
+        lu = self.bounds.setdefault(v, [None, None])
+        if kind in ('BV', 'LI', 'UI') and v not in self.intset:
+            self.intvars.append(v)
+            self.intset.add(v)
+        if kind in ('FR', 'MI'): minf.add(v)
+        elif kind in ('LO', 'LI', 'FX', 'BV'): minf.discard(v)
+        if kind in ('FR', 'PL'): lu[1] = None
+        elif kind == 'MI': lu[0] = None
+        elif kind == 'BV': lu[:] = [fract(0), fract(1)]
+        elif kind in ('LO', 'LI'): lu[0] = fract(num)
+        elif kind in ('UP', 'UI'): lu[1] = fract(num)
+        elif kind == 'FX': lu[:] = [fract(num), fract(num)]
+        else: raise ValueError("Unsupported bound type: "+kind)
+
+class ModelCache(object):
+    '''compiled models in a directory, one file for each, named by
+a content hash of the source. A model read again is loaded without
+parsing or converting strings, see LPParser.compile.'''
+    version = 1 #of the compiled format
+
+    def __init__(self, directory):
+        if not os.path.isdir(directory): os.makedirs(directory)
+        self.directory = directory
+
+    def load(self, filename, fixed=False, out=None):
+        'the model in filename, read as MPS if it ends with ".mps".'
+        with open(filename, 'rb') as f: src = f.read()
+        mps = filename.lower().endswith('.mps')
+        key = hashlib.sha1(src)
+        key.update(('|%s|%s|%s'%(mps, fixed, self.version)).encode())
+        path = os.path.join(self.directory, key.hexdigest()+'.lpc')
+        try:
+            with open(path, 'rb') as f:
+                return LPParser.fromcompiled(marshal.load(f), out)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            pass #not cached yet, or unreadable
+        text = src.decode()
+        prob = MPSParser(text, fixed, out) if mps else LPParser(text, out)
+        fd, tmp = tempfile.mkstemp(dir=self.directory) #then renamed,
+        with os.fdopen(fd, 'wb') as f: #never read half written
+            marshal.dump(prob.compile(), f)
+        os.rename(tmp, path)
+        return prob
 
 from random import randint #wolf perturbation
 
@@ -261,118 +786,344 @@ def checkask(msg, default, values):
             continue
         return s
 
-Infty = "Infty"
+def _nbytes(obj):
+    '''rough size in bytes of obj and all it holds, each object counted
+once: lists, tuples, sets, dicts, Fractions and numpy arrays.'''
+    seen, todo, n = set(), [obj], 0
+    while todo:
+        o = todo.pop()
+        if id(o) in seen: continue
+        seen.add(id(o))
+        n += sys.getsizeof(o) #of a numpy array, its data too
+        if type(o) is fract: todo += [o.numerator, o.denominator]
+        elif isinstance(o, dict): todo += list(o.items())
+        elif isinstance(o, (list, tuple, set, frozenset)): todo += o
+    return n
 
-class Tableau(object):
 
-    def __init__(self, prob, interactive=True):
-        '''no variable name should start with '@' in prob.'''
-        self.text = str(prob)
-        self.vars = [''] #reserved
-        def terms(td):
+class Tableau(object):
+    engine = 'fraction' #exact arithmetic with Fractions
+    engines = {} #engine name -> class, filled after the classes
+    #tolerances, none needed by exact arithmetic
+    feas_tol = opt_tol = 0
+    partial_size = 10 #candidate list of partial pricing
+    #a snapshot every snapshot_every history entries, see goto, only
+    #if set or interactive (then 20); past snapshot_bytes of them in
+    #all, every other one is dropped
+    snapshot_every, snapshot_bytes = None, 32*2**20
+    #upper bounds kept out of the matrix, see _complement;
+    #otherwise they are added as rows
+    upper_bounds = True
+    infty = "Infty" #how infinity is shown in the reports
+
+    def __new__(cls, *args, **kwargs):
+        'Tableau(prob, engine="float") gives the engine subclass.'
+        engine = args[2] if len(args)>2 else kwargs.get('engine')
+        if engine and engine != cls.engine:
+            if engine not in Tableau.engines:
+                raise ValueError("unknown engine: "+engine)
+            cls = Tableau.engines[engine]
+        return object.__new__(cls)
+
+    def __init__(self, prob, interactive=True, engine=None, out=None):
+        '''no variable name should start with '@' in prob.
+engine is picked by __new__, see Tableau.engines.
+out: the output sink, see Output and NullOutput.'''
+        self.out = Output() if out is None else out
+        self.model = copy(prob) #its bounds as now, for the text
+        self.model.bounds = dict((v, lu[:]) for v, lu in prob.bounds.items())
+        def terms(td): #compiled models have Fractions already
             ts = {}
-            for v,c in td.items(): ts[v] = fract(c)
+            for v,c in td.items():
+                ts[v] = c if type(c) is fract else fract(c)
             return ts
         sts = [(terms(t),r, fract(b)) for t,r,b,p in prob.sts]
         self.rownames = [p for t,r,b,p in prob.sts]
+        used = set(prob.vars) #with those in no row, as bin: z
+        for t, r, b in sts: used.update(t)
+        #lower bounds: x = l + x' with x' >= 0, so l moves to the RHS
+        #(of the objective too, it keeps the constant)
+        bounds = dict((v, (l or 0, u)) for v, (l, u) in prob.bounds.items()
+                      if v in used)
+        for i, (t,r,b) in enumerate(sts):
+            for v in t:
+                if v in bounds: b -= t[v]*bounds[v][0]
+            sts[i] = t, r, b
+        for v in prob.sortvars(list(bounds)): #the others as rows
+            l, u = bounds[v]
+            if u is None or self.upper_bounds: continue
+            sts.append(({v: fract(1)}, 1, u-l))
+            self.rownames.append('%s]'%v)
+        self.negated = set() #rows with b<0, multiplied by -1
         for i, (t,r,b) in enumerate(sts):
             if i==0: self.obj_dir = r
             if i==0 and r<0 or i and b < 0: #minimize or b<0
                 for v in t: t[v] = -t[v]
                 sts[i] = t, -r, -b
-            for v in prob.fvs: #free vars
-                if v not in t: continue
+                if i: self.negated.add(i)
+            for v in [v for v in t if v in prob.fvset]: #free vars
                 t['!%s'%v] = - t[v] #negate coefficient
-            for v in t:
-                if v not in self.vars:
-                    self.vars.append(v)
-                    
-        self.vars = prob.sortvars(self.vars) #sort by var name
+            used.update(t)
+
+        #sort by var name, '' is reserved for the RHS and goes first
+        self.vars = prob.sortvars([''] + list(used))
         self.vars[0] = '(RHS)'
         
         #add surplus vars
+        self.slackcol = [0]*len(sts) #slack or surplus column of each row
         for idx, (t,r,b) in enumerate(sts):
             if r>=0: continue
             v = '#%i'%idx
-            t[v] = -1
+            t[v] = fract(-1) #an int would give floats in _pivot
+            self.slackcol[idx] = len(self.vars)
             self.vars.append(v)
+        #unit column (slack or artificial) of each row,
+        #together they make the initial base
+        self.unit = [0]*len(sts) #0: the objective row
         #add slack vars
         for idx, (t,r,b) in enumerate(sts):
             if idx==0 or r<=0: continue
             v = '$%i'%idx #slack
-            t[v] = 1
+            t[v] = fract(1)
+            self.unit[idx] = self.slackcol[idx] = len(self.vars)
             self.vars.append(v)
         #add artificial vars, in the end.
-        #NOTE: not matrix I
+        #NOTE: not matrix I, the unit columns are out of row order
         for idx, (t,r,b) in enumerate(sts):
             if idx==0 or r>0: continue
             v = '@%i'%idx #artificial
-            t[v] = 1
+            t[v] = fract(1)
+            self.unit[idx] = len(self.vars)
             self.vars.append(v)
         #ready for tableau
-        fobj = sts[0][0]
-        self.fobj = [fobj.get(v,0) for v in self.vars]
+        #column of each variable, see also slackcol and baserow
+        self.col = col = dict((v, i) for i, v in enumerate(self.vars))
+        self.lb = [0]*len(self.vars) #added back in the solution
+        self.ub = [None]*len(self.vars) #of x', None: no upper bound
+        for v, (l, u) in bounds.items():
+            self.lb[col[v]] = l
+            if u is not None and self.upper_bounds: self.ub[col[v]] = u-l
+        self.flipped = set() #columns at upper bounds, see _complement
+        self.bounded = any(u is not None for u in self.ub)
+        self.fobj = self._make_row(sts[0][0], col, sts[0][2])
         self.origrows = [None]
         for i, (t,r,b) in enumerate(sts):
             if i==0: continue #ignore objective
-            row = [t.get(v,0) for v in self.vars]
-            row[0] = b
-            self.origrows.append(row)
+            self.origrows.append(self._make_row(t, col, b))
 
-        self._method = Tableau._largest_sigma
+        self.meth = 'largest_sigma'
         self.interactive = interactive
         #The virtual perturbation is not proven
         self.virtual_perturbation = False
+        #the lexicographic ratio test is, see _lex_row
+        self.lexicographic = not interactive
         #we may also use flat wolf randomization
-        self.flat_wolf = not interactive
+        self.flat_wolf = False
         #degenerated rows for wolf randomization
         self.degenerated = ()        
         self.hist = [] #history, to undo
+        self.snaps, self.snaps_hist = [], None #see _checkpoint
+        self.export = None #a TableWriter to get each tableau
+        self.probe = None #a Probe to time and count the solves
+        self._reset_pricing()
+
+    @property
+    def text(self):
+        'the model as text, only made when saved.'
+        return str(self.model)
+
+    @property
+    def stats(self):
+        'what the probe collected, see Probe.stats; None without one.'
+        return self.probe.stats() if self.probe else None
+
+    def _make_row(self, terms, col, rhs=0):
+        'tableau row from {var: coefficient}, col maps var to column.'
+        row = [0]*len(self.vars)
+        for v, c in terms.items(): row[col[v]] = c
+        row[0] = rhs
+        return row
 
     @property
     def meth(self):
-        if self._method == Tableau._best_objective:
-            return "best_objective"
-        if self._method == Tableau._smallest_index:
-            return "smallest_index"
-        if self._method == Tableau._largest_sigma:
-            return "largest_sigma"
+        for name in self.method_names:
+            if self._method == getattr(type(self), '_'+name):
+                return name
         return "user_choice"
 
     @meth.setter
     def meth(self, name):
-        if name == "best_objective":
-            self._method = Tableau._best_objective
-        elif name == "smallest_index":
-            self._method = Tableau._smallest_index
-        elif name == "largest_sigma":
-            self._method = Tableau._largest_sigma
-        elif name == 'user_choice':
-            self._method = Tableau._user_choice            
-        else: raise ValueError("unknown method: "+name)
+        #look up on the class, so engines may override a method
+        if name not in self.method_names:
+            raise ValueError("unknown method: "+name)
+        self._method = getattr(type(self), '_'+name)
+        self.weighting = None #weights of another method are useless
 
     def _pivot_element(self):
         c = self._method(self)
         if type(c) is not int:
             return c #user choice
-        r = self._pivot_row(c) if c else 0
+        r = self._ratio_test(c) if c else 0
         return r, c
 
+    def _ratio_test(self, col):
+        '''_pivot_row, then the upper bounds: -1 if x[col] reaches
+its upper bound first, it is complemented and no pivot is needed.
+A basic variable to reach its upper bound first is complemented,
+then it leaves at 0 as usual. See _complement.'''
+        r = self._pivot_row(col)
+        if not self.bounded: return r
+        rows, ub, base = self.rows, self.ub, self.base
+        theta = rows[r][0]/rows[r][col] if r else None
+        if r and self.degenerated: #perturbed, an infinitely small step
+            theta = 0 #only a zero step to a bound comes first
+        flip, t = 0, None #the basic variable up to its bound first
+        for i in range(1, self.m+1):
+            u, a = ub[base[i]], rows[i][col]
+            if u is None or a >= -self.feas_tol: continue
+            s = (rows[i][0] - u)/a
+            if t is None or s < t or s == t and base[i] < base[flip]:
+                flip, t = i, s
+        u = ub[col]
+        if u is not None and (theta is None or u <= theta)\
+           and (t is None or u <= t):
+            self._complement(col)
+            return -1
+        if flip and (theta is None or t < theta or t == theta == 0):
+            self._complement(base[flip])
+            return flip
+        return r
 
-    def _improvement(self, c):
-        ratio = [ r[0]/r[c] for r in self.rows[1:] if r[c]>0]
-        if len(ratio) == 0: return None #float('infinity')
-        return min(ratio)*self.rows[0][c]
+    def _complement(self, c, hist=True):
+        '''x[c] = ub - x~[c], or back. A nonbasic x[c] is then at its
+upper bound: column c changes sign and ub times it moves to the RHS.
+A basic x[c] has its row negated, with RHS ub - RHS.'''
+        if hist: self._checkpoint()
+        u, rows = self.ub[c], self.rows
+        r = self.baserow.get(c)
+        if r:
+            row = rows[r]
+            for j in range(len(self.vars)):
+                if row[j]: row[j] = -row[j]
+            row[c], row[0] = 1, u + row[0]
+            self.dirty.add(r)
+        else:
+            if self.degenerated: self.vobj -= rows[0][c]*u
+            for i in range(self.m+1):
+                a = rows[i][c]
+                if not a: continue
+                rows[i][0] -= a*u
+                rows[i][c] = -a
+            self.ratios.pop(c, None)
+        self.flipped ^= set([c])
+        if hist: self.hist.append((c, c))
+
+    def _flip_cost(self, cost):
+        'cost of the tableau with the complemented columns.'
+        if not self.flipped: return cost
+        cost = copy(cost)
+        for c in self.flipped:
+            cost[0] -= cost[c]*self.ub[c]
+            cost[c] = -cost[c]
+        return cost
+
+    def _rhs(self):
+        'b of the tableau with the complemented columns.'
+        b = list(self.b)
+        for c in self.flipped:
+            for i in range(self.m):
+                a = self.origrows[i+1][c]
+                if a: b[i] -= a*self.ub[c]
+        return b
+
+    def _step(self, entry, back=False):
+        '''redo a pivot or complement of the history, or undo if back.
+The marks of the end of a phase, (r, 0) or (0, c), are skipped.'''
+        vout, vin = entry
+        if not vout or not vin: return 0 #a mark
+        if vout == vin:
+            self._complement(vin, False)
+            return 0
+        if back: vout, vin = vin, vout
+        r = self.baserow[vout]
+        self._pivot(r, vin, False)
+        return r
+
+
+    def _reset_pricing(self):
+        'forget what pricing kept from the pivots before.'
+        self.weighting = None #see _update_weights
+        #partial pricing: candidate columns, where the next scan starts
+        self.candidates, self.scan_at = [], 0
+        #see _cached_ratios
+        self.ratios, self.dirty, self.ratio_rhs = {}, set(), ()
+
+    def _pre_pivot(self, row, col, hist):
+        'called by _pivot before the tableau changes.'
+        if hist: self._checkpoint()
+        if hist and self.weighting: self._update_weights(row, col)
+        if self.ratios: #rows without col in them don't change
+            rows = self.rows
+            self.dirty.update(i for i in range(1, self.m+1) if rows[i][col])
 
     def _best_objective(self):
         best, idx, sigma = fract(-1), 0, self.rows[0]
-        for i in range(1, self.cols):
-            if sigma[i] <= 0: continue
-            imp = self._improvement(i)
-            if imp is None: return i #infinity
+        cand = [i for i in range(1, self.cols) if sigma[i] > 0]
+        ratios = self._cached_ratios(cand)
+        for i in cand:
+            ratio = ratios[i][0]
+            if ratio is None: return i #infinity
+            imp = ratio*sigma[i]
             if imp <= best: continue #infty can't be converted
             best, idx = imp, i
         return idx #0: reached optimality
+
+    def _cached_ratios(self, cols):
+        '''min ratio of the columns, see _min_ratios. The results are
+kept over pivots: only rows changed since (by a pivot or in the RHS)
+are tested again, and a column is tested in full only if its min
+ratio was in such a row.'''
+        rows, cache, dirty = self.rows, self.ratios, self.dirty
+        if len(self.ratio_rhs) == self.m+1:
+            rhs = self.ratio_rhs
+            dirty.update(i for i in range(1, self.m+1) if rows[i][0] != rhs[i])
+        keep = [c for c in cols if c in cache and cache[c][1] not in dirty]
+        ratios = self._min_ratios([c for c in cols if c not in keep],
+                                  range(1, self.m+1))
+        part = self._min_ratios(keep, sorted(dirty))
+        for c in keep:
+            a, b = cache[c], part[c]
+            if b[0] is None or a[0] is not None and a[0] <= b[0]:
+                ratios[c] = a
+            else: ratios[c] = b
+        self.ratios, self.dirty = ratios, set()
+        self.ratio_rhs = [None]+[rows[i][0] for i in range(1, self.m+1)]
+        return ratios
+
+    def _min_ratios(self, cols, rows):
+        '''batch ratio test of the columns over the rows, in one pass.
+{col: (ratio, row)}, (None, 0) if no entry is positive.
+Ratios are compared as pairs of ints, only the min is a Fraction.'''
+        best = {} #col: (numerator, denominator, row)
+        for i in rows:
+            row = self.rows[i]
+            self._ratio_pass(best, i, row[0], ((c, row[c]) for c in cols))
+        return self._ratio_result(best, cols)
+
+    @staticmethod
+    def _ratio_pass(best, i, b, entries):
+        bn, bd = b.numerator, b.denominator
+        for c, a in entries:
+            if a <= 0: continue
+            n, d = bn*a.denominator, bd*a.numerator #ratio n/d, d>0
+            t = best.get(c)
+            if t is None or n*t[1] < t[0]*d: best[c] = (n, d, i)
+
+    @staticmethod
+    def _ratio_result(best, cols):
+        ratios = dict((c, (None, 0)) for c in cols)
+        for c, (n, d, i) in best.items(): ratios[c] = (fract(n, d), i)
+        return ratios
  
     def _smallest_index(self):
         sigma = self.rows[0]
@@ -387,6 +1138,101 @@ class Tableau(object):
             best, idx = sigma[i], i
         return idx #0: reached optimality
  
+    def _steepest_edge(self):
+        return self._weighted_choice('steepest_edge')
+
+    def _devex(self):
+        return self._weighted_choice('devex')
+
+    def _weighted_choice(self, kind):
+        'largest sigma**2/weight, the weights are kept by the pivots.'
+        if self.weighting != kind: self._init_weights(kind)
+        best, idx, sigma, w = 0, 0, self.rows[0], self.weights
+        for i in range(1, self.cols):
+            s = sigma[i]
+            if s <= 0: continue
+            s = s*s/w[i]
+            if s <= best: continue
+            best, idx = s, i
+        return idx #0: reached optimality
+
+    def _init_weights(self, kind):
+        '''steepest_edge: 1 + |column|**2 of the current tableau.
+devex: 1 for all, the nonbasic columns are the reference framework.'''
+        n = len(self.vars)
+        w = [1]*n
+        if kind == 'steepest_edge':
+            for r in range(1, self.m+1):
+                row = self.rows[r]
+                for c in range(n):
+                    if row[c]: w[c] += row[c]*row[c]
+        self.weights, self.weighting = w, kind
+
+    def _kappa(self, col):
+        'column col dotted with every column, before the pivot.'
+        n = len(self.vars)
+        kappa = [0]*n
+        for r in range(1, self.m+1):
+            row = self.rows[r]
+            e = row[col]
+            if not e: continue
+            for c in range(n): kappa[c] += e*row[c]
+        return kappa
+
+    def _update_weights(self, row, col):
+        '''weights for the pivot on (row, col), called before it:
+steepest edge by Goldfarb and Reid, devex by Forrest and Goldfarb.
+Only the pivot row is needed, and the column products for the
+steepest edge.'''
+        w, wq = self.weights, self.weights[col]
+        prow = self.rows[row]
+        prow = [prow[c] for c in range(len(self.vars))]
+        p = prow[col]
+        if self.weighting == 'devex':
+            for c, a in enumerate(prow):
+                if a: w[c] = max(w[c], a*a/(p*p)*wq)
+        else:
+            kappa = self._kappa(col)
+            for c, a in enumerate(prow):
+                if not a: continue
+                a = a/p
+                w[c] = max(w[c] - 2*a*kappa[c] + a*a*wq, 1 + a*a)
+        w[self.base[row]] = max(wq/(p*p), 1) #the leaving variable
+
+    def _partial_pricing(self):
+        '''largest sigma among the candidate columns. Only when no
+candidate is left, the columns are scanned again, from where the
+last scan stopped, for up to partial_size new candidates.'''
+        cand = [c for c in self.candidates if c < self.cols]
+        cand = [(s, c) for s, c in zip(self._sigmas(cand), cand)
+                if s > self.opt_tol]
+        if not cand: cand = self._scan()
+        self.candidates = [c for s, c in cand]
+        best, idx = 0, 0
+        for s, c in cand:
+            if idx and s <= best: continue
+            best, idx = s, c
+        return idx #0: reached optimality
+
+    def _scan(self):
+        'next candidates with their sigma, see _partial_pricing.'
+        n, k = self.cols-1, self.partial_size
+        order = [(self.scan_at+i)%n + 1 for i in range(n)]
+        cand = []
+        for i in range(0, n, k): #k columns at a time
+            cols = order[i:i+k]
+            cand += [(s, c) for s, c in zip(self._sigmas(cols), cols)
+                     if s > self.opt_tol]
+            if len(cand) >= k: break
+        cand = cand[:k]
+        if cand: self.scan_at = cand[-1][1] % n #after the last one
+        return cand
+
+    def _sigmas(self, cols):
+        'sigma of the columns.'
+        sigma = self.rows[0]
+        return [sigma[c] for c in cols]
+
     _auto_choice = _smallest_index
     def _user_choice(self):
        if not self.interactive:
@@ -396,32 +1242,45 @@ class Tableau(object):
        c = int(checkask("Which column? 1-%i [auto]:"%ub, '0', choices))
        if c == 0:
            c = self._auto_choice()
-           puts("Auto column: %i"%c)
+           self.out("Auto column: %i"%c)
        ub = len(self.rows) - 1
        choices = [str(i) for i in range(ub+1)]
        r = int(checkask("Which row? 1-%i [auto]:"%ub, '0', choices))
        if r == 0:
-           r = self._pivot_row(c)
-           puts("Auto row: %i"%r)
+           r = self._ratio_test(c)
+           self.out("Auto row: %i"%r)
        return r, c
 
     def _restore(self):
-        for  i in range(1,self.m+1):#self.degenerated:
-            #restore the RHS: B^{-1} b
-            self.rows[i][0] = sum(b*vi for b,vi in
-                        zip(self.b, self.rows[i][-self.m:]))
+        self._restore_rhs()
         #restore the objective value too
         self.rows[0][0] = self.vobj
         self.degenerated = () #out of degeneracy
+        #snapshots taken since have the randomized RHS, see goto
+        self.snaps = [s for s in self.snaps if not s[1][1]]
+        if self.probe: self.probe.restore(self)
+        if self.export: self.export.table(self._table())
         if not self.interactive: return
-        puts("Out of degeneracy! Restored tableau:")
+        self.out("Out of degeneracy! Restored tableau:")
         self.display()
 
+    def _restore_rhs(self):
+        rhs = self._rhs()
+        for  i, bi in enumerate(self._binv()):#self.degenerated:
+            #restore the RHS: B^{-1} b
+            self.rows[i+1][0] = sum(b*vi for b,vi in zip(rhs, bi))
+
+    def _binv(self):
+        'rows of B^{-1}, read from the unit columns.'
+        unit = self.unit[1:]
+        return [[self.rows[r][k] for k in unit]
+                for r in range(1, self.m+1)]
+
     def _pivot_row(self, col):
         '''always use "smallest_index" to break tie.'''
         if self.degenerated:
             rows = self.degenerated
-            puts("degenerated rows:"+ repr(rows))
+            if self.out: self.out("degenerated rows:"+ repr(rows))
         else: rows = list(range(1,self.m+1))
         rhs = [self.rows[i][0] for i in rows]
         lhs = [self.rows[i][col] for i in rows]
@@ -437,6 +1296,10 @@ class Tableau(object):
         nrat = sum(1 for r in ratio if r==mrat)
         needcare = (mrat == 0 and nrat > 1)
 
+        if nrat > 1 and self.lexicographic:
+            return self._lex_row(col, [i for i, l, r in zip(rows, lhs, rhs)
+                                       if l > 0 and r == mrat*l])
+
         if needcare and self.virtual_perturbation: 
             lmin, idx = max(lhs)+1, 0
             for i, l, r in zip(rows, lhs, rhs):
@@ -451,7 +1314,7 @@ class Tableau(object):
             for i in self.degenerated:
                 if self.rows[i][0]: continue #re-randomize?
                 #wolf randomization, without recursion (flat)
-                self.rows[i][0] = fract(1)/randint(2,10)
+                self.rows[i][0] = self._below_ub(i, fract(1)/randint(2,10))
             return self._pivot_row(col)
 
         smallest, ri = len(self.vars) + 1, -1
@@ -463,26 +1326,52 @@ class Tableau(object):
         assert ri >= 0, "row index should never be negative!"
         return ri #smallest_index
 
-    def display(self, r=0, itn=None, sep="\t", asformula=False):
+    def _lex_row(self, col, ties):
+        '''the row of the lexicographic ratio test among the rows tied
+at the min ratio: the least row of B^{-1} over its entry in col,
+compared a column at a time, only as far as a tie is left. Rows of
+B^{-1} differ, so one is left. As the rows of [b B^{-1}] start out
+lexicographically positive and stay so, no base comes back: the
+simplex method can't cycle, and the tableau is not changed.'''
+        rows = self.rows
+        for k in self.unit[1:]:
+            if len(ties) < 2: break
+            q = [rows[i][k]/rows[i][col] for i in ties]
+            m = min(q)
+            ties = [i for i, v in zip(ties, q) if v == m]
+        return ties[0]
+
+    def _below_ub(self, r, v):
+        'a perturbed RHS v <= 1/2 kept below the upper bound.'
+        u = self.ub[self.base[r]]
+        return v*u if u is not None and u < 1 else v
+
+    def _table(self, r=0, itn=None):
+        'the tableau as rows of cells, the pivot row r is marked.'
         if itn is None: itn = len(self.hist)
         varn, nvars = self.vars[:self.cols], self.cols
-        puts(sep.join(varn[c-1] if c else '[%i]'%itn 
-				for c in range(nvars+1)))
+        #~x: complemented, ub - x
+        varn = ['~'+v if i in self.flipped else v for i, v in enumerate(varn)]
+        yield ['[%i]'%itn] + varn
         base = [varn[b] if b else 'sigma' for b in self.base]
         if r: base[r] = base[r]+'*'
         for b, crow in zip(base, self.rows):
-            if asformula:
-                puts(sep.join('=%s'%crow[c-1] if c else b
-				for c in range(nvars+1)))
-            else:
-                puts(sep.join(str(crow[c-1]) if c else b
-				for c in range(nvars+1)))
+            yield [b] + [crow[c] for c in range(nvars)]
+
+    def display(self, r=0, itn=None, sep="\t", asformula=False):
+        fmt = '=%s' if asformula else '%s'
+        for i, cells in enumerate(self._table(r, itn)):
+            self.out(sep.join(cells if i == 0 else
+                              cells[:1] + [fmt % v for v in cells[1:]]))
         if not asformula:
-            puts('column select: %s, per[t]urbation: %r, [w]olf: %r'
-             %(self.meth, self.virtual_perturbation, self.flat_wolf))
+            self.out('column select: %s, per[t]urbation: %r, [w]olf: %r, '
+                     '[l]exicographic: %r' %(self.meth,
+                     self.virtual_perturbation, self.flat_wolf,
+                     self.lexicographic))
 
  
     def _pivot(self, row, col, hist=True):
+        self._pre_pivot(row, col, hist)
         e = self.rows[row][col]
         self.rows[row] =  [k/e for k in self.rows[row]]
         for r in range(len(self.rows)):
@@ -492,124 +1381,220 @@ class Tableau(object):
             self.rows[r] = [d-e*s for d,s in
                     zip(self.rows[r],self.rows[row])]
         if hist: self.hist.append((self.base[row], col))
-        self.base[row] = col #must go after history update
+        self._set_basic(row, col) #must go after history update
+
+    def _set_basic(self, row, col):
+        'col enters the base in row.'
+        del self.baserow[self.base[row]]
+        self.baserow[col] = row
+        self.base[row] = col
+
+    def _index_base(self):
+        'baserow: the row of each basic column, kept by _set_basic.'
+        self.baserow = dict((b, r) for r, b in enumerate(self.base) if r)
+
+    def _snapshot(self):
+        'a copy of what the pivots change, see _load.'
+        return self._copy_rows(), self.base[:], set(self.flipped)
+
+    def _load(self, snap):
+        rows, base, flipped = snap
+        self.rows = rows
+        self.rows = self._copy_rows() #the snapshot may be loaded again
+        self.base, self.flipped = base[:], set(flipped)
+        self._index_base()
+
+    def _state(self):
+        'the tableau with its wolf randomization and weights.'
+        return (self._snapshot(), list(self.degenerated),
+                getattr(self, 'vobj', None),
+                self.weighting, self.weighting and copy(self.weights))
+
+    def _set_state(self, state):
+        snap, degenerated, self.vobj, weighting, weights = state
+        self._load(snap)
+        self.degenerated = degenerated[:] if degenerated else ()
+        self._reset_pricing()
+        if weighting: self.weighting, self.weights = weighting, copy(weights)
+
+    def _last_row(self):
+        'the row of the last history entry, 0 if none or a complement.'
+        if not self.hist: return 0
+        vout, vin = self.hist[-1]
+        return 0 if vout == vin else self.baserow[vin]
+
+    def _checkpoint(self):
+        '''called before a new history entry: keeps the tableau after
+the first n entries when n is a multiple of snapshot_every.'''
+        every = self.snapshot_every or self.interactive and 20
+        if not every: return #no snapshots
+        hist = self.hist
+        if self.snaps_hist is not hist: #a new history
+            self.snaps, self.snaps_hist = [], hist
+        snaps, n = self.snaps, len(hist)
+        while snaps and snaps[-1][0] > n: snaps.pop() #undone
+        if n % every or snaps and snaps[-1][0] == n: return
+        state = self._state()
+        size = _nbytes(state)
+        if size > self.snapshot_bytes: return #too big to keep
+        snaps.append((n, state, size))
+        while sum(s[2] for s in snaps) > self.snapshot_bytes:
+            every = self.snapshot_every = 2*every
+            snaps[:] = [s for s in snaps if s[0] % every == 0]
+
+    def goto(self, itn, at=None):
+        '''the tableau after the first itn entries of the history, from
+the tableau after the first "at" of them (all by default): loads the
+last snapshot before itn if that is closer, then steps through the
+history. A snapshot taken in degeneracy brings back its wolf
+randomization. Returns the row of the last step, 0 if none.'''
+        hist = self.hist
+        if at is None: at = len(hist)
+        assert 0 <= itn <= len(hist), "No such iteration!"
+        r = 0
+        if self.snaps_hist is hist:
+            snaps = [s for s in self.snaps if s[0] <= itn]
+            #stepping back from at costs at - itn pivots
+            if snaps and itn - snaps[-1][0] < abs(at - itn):
+                at, state, size = snaps[-1]
+                self._set_state(state)
+        while at > itn:
+            at -= 1
+            if all(hist[at]): r = self._step(hist[at], True) #not a mark
+        while at < itn:
+            if all(hist[at]): r = self._step(hist[at])
+            at += 1
+        self.weighting = None #start the weights over
+        return r
 
     def undo(self):
-        if not self.hist: return 0
-        vout, vin = self.hist.pop()
-        r = self.base.index(vin)
-        self._pivot(r, vout, False)
+        hist = self.hist
+        while hist and not all(hist[-1]): hist.pop() #marks
+        if not hist: return 0
+        r = self._step(hist.pop(), True)
+        self.weighting = None #start the weights over
         return r
     
     def ipeek(self):
         current = last = len(self.hist) - 1
+        here, r = self._state(), 0 #to go back to
         while True:
-            s = input("Peek menu: 1.prev 2.next 3.abort: ")
+            s = input("Peek menu: 1.prev 2.next 3.abort 4.goto: ")
             if '1' in s:
                 if current < 0:
-                    puts("Already at beginning.")
+                    self.out("Already at beginning.")
                     continue
-                vout, vin = self.hist[current]
-                r = self.base.index(vin)
-                self._pivot(r, vout, False)
+                r = self._step(self.hist[current], True)
                 self.display(r, current)
                 current -= 1
                 continue
             if '2' in s:
                 if current >= last:
-                    puts("Already at last, choose 3 to abort.")
+                    self.out("Already at last, choose 3 to abort.")
                     continue
                 current += 1
-                vout, vin = self.hist[current]
-                r = self.base.index(vout)
-                self._pivot(r, vin, False)
+                r = self._step(self.hist[current])
                 self.display(r, current+1)
                 continue
             if '3' in s:
-                while current < last:
-                    current += 1
-                    vout, vin = self.hist[current]
-                    r = self.base.index(vout)
-                    self._pivot(r, vin, False)
-                return r
-            puts("Bad choice! ", end='')
+                if current == last: return r
+                self._set_state(here)
+                return self._last_row()
+            if '4' in s:
+                t = input("Iteration 0-%i: " % (last+1))
+                if not t.isdigit() or int(t) > last+1:
+                    self.out("No such iteration!")
+                    continue
+                r = self.goto(int(t), current+1)
+                current = int(t) - 1
+                self.display(r, current+1)
+                continue
+            self.out("Bad choice! ", end='')
             
     def shake(self):
         #ramble RHS by adding random numbers
-        rhs = [self.rows[r][0] for r in range(self.m+1)]
+        here = self._state() #to go back to, RHS and all
         for r in range(1, self.m+1):
             self.rows[r][0] += randint(1, 20)
-        current = last = len(self.hist) - 1
+        current = len(self.hist) - 1
         while current >= 0:
-            vout, vin = self.hist[current]
-            r = self.base.index(vin)
-            self._pivot(r, vout, False)
+            r = self._step(self.hist[current], True)
             current -= 1
             if min(self.rows[t][0] for t in range(1,self.m+1))<0:
-                puts("SHAKER found infeasibility!")
+                self.out("SHAKER found infeasibility!")
                 self.display(r, current+1)
                 inf = True
                 break
         else: inf = False
-        while current < last:
-            current += 1
-            vout, vin = self.hist[current]
-            r = self.base.index(vout)
-            self._pivot(r, vin, False)
         if inf:
-            puts([self.rows[rr][0] for rr in range(self.m+1)])
-        for rr in range(1, self.m+1):
-            self.rows[rr][0]  = rhs[rr]
-        return r
+            self.out([self.rows[rr][0] for rr in range(self.m+1)])
+        self._set_state(here)
+        return self._last_row()
 
     def ihelp(self):
-        if self.interactive: puts("""
+        if self.interactive: self.out("""
 ===================|| Interaction Help ||===================
 
 After each tableau, you are given the rule of operation.
-Then you are given four options of pivot method:
+Then you are given six options of pivot method:
     1.sigma: choose entering column by largest sigma
     2.index: choose entering column by smallest index
     3.objective: choose entering column by best improvement
     4.user: input your own entering column and row
+    5.steepest: choose entering column by steepest edge
+    6.devex: choose entering column by devex weights
+    7.partial: choose entering column from a few candidates
 
 If you just hit the 'return' key, nothing will change.
 To choose a method, type the digit. To toggle the perturbation
 status, type 't'. To enable wolf randomization, type 'w'.
+To toggle the lexicographic ratio test, type 'l'.
 If you just need the final result, type 'go'.
-You may combine a number, a 't', a 'w', and a 'go' together.
+You may combine a number, a 't', a 'w', an 'l' and a 'go' together.
 Type 'undo' to undo, type 'peek' to peek at previous tableaux.
+A column shown as '~X' is complemented: it stands for (upper - X).
 """)
 
-    method_names = ('largest_sigma', 'smallest_index', 'best_objective', 'user_choice')
+    method_names = ('largest_sigma', 'smallest_index', 'best_objective',
+                    'user_choice', 'steepest_edge', 'devex',
+                    'partial_pricing')
     def interact(self, r=0):
+        if self.export: self.export.table(self._table(r))
         if not self.interactive: return
         self.display(r)
-        s = input("1.sigma 2.index 3.objective 4.user: ").lower()
+        s = input("1.sigma 2.index 3.objective 4.user "
+                  "5.steepest 6.devex 7.partial: ").lower()
         if not s: return #no changes
         if 't' in s: #swap perturbation
             self.virtual_perturbation = not self.virtual_perturbation
-            puts("virtual perturbation:", self.virtual_perturbation)
+            if self.virtual_perturbation: self.lexicographic = False
+            self.out("virtual perturbation:", self.virtual_perturbation)
         if 'w' in s:
             self.flat_wolf = not self.flat_wolf 
-            if self.flat_wolf: self.virtual_perturbation = False
-            puts("flat wolf randomization:", self.flat_wolf)
-
-        mc = [c for c in '1234' if c in s]
+            if self.flat_wolf:
+                self.virtual_perturbation = self.lexicographic = False
+            self.out("flat wolf randomization:", self.flat_wolf)
+        if 'l' in s:
+            self.lexicographic = not self.lexicographic
+            if self.lexicographic:
+                self.virtual_perturbation = self.flat_wolf = False
+            self.out("lexicographic ratio test:", self.lexicographic)
+
+        mc = [c for c in '1234567' if c in s]
         if len(mc)>1:
-            puts("Can't choose multiple methods at one time.")
+            self.out("Can't choose multiple methods at one time.")
         elif mc:
             self.meth = self.method_names[ord(mc[0])-ord('1')]
-            #puts("method changed to: %s" % self._method)
+            #self.out("method changed to: %s" % self._method)
         if 'go' in s:
             self.interactive = False
-            puts("Turned off interaction.")
+            self.out("Turned off interaction.")
         if 'undo' == s:
             #while input("Undo? [y]/n") not in ('n','N'):
             r = self.undo()
             if r: self.display(r)
             else:
-                puts("Already at the first tableau.")
+                self.out("Already at the first tableau.")
                 #break
             #ask about what to do next
             self.interact(r)
@@ -622,41 +1607,50 @@ Type 'undo' to undo, type 'peek' to peek at previous tableaux.
 
 
     def _phase_solve(self, maxit):
-        puts("Start Phase %s."%[0,'I','II'][self.phase])
+        name = [0,'I','II'][self.phase]
+        self.out("Start Phase %s."%name)
+        probe = self.probe
+        if probe: probe.begin_phase(self, name)
         self.interact()
-        while maxit:
-            r, c = self._pivot_element()
-            if c == 0:
-                puts("Found optimal solution at iteration [%i]!"
-                      % len(self.hist))
-                if self.degenerated: self._restore()
-                self.hist.append((r, c))
-                return self.phase
-            if r == 0:
-                puts("Infinite solutionn!")
-                self.phase = 3
-                self.hist.append((r, c))
-                return 0
-            self._pivot(r,c)
-            self.interact(r)
-            maxit -= 1
-        puts("Hit max iteration!")
-        self.phase = - self.phase #may continue
-        return 0
+        try:
+            while maxit:
+                if probe: r, c = probe.pivot_element(self)
+                else: r, c = self._pivot_element()
+                if c == 0:
+                    self.out("Found optimal solution at iteration [%i]!"
+                          % len(self.hist))
+                    if self.degenerated: self._restore()
+                    self.hist.append((r, c))
+                    return self.phase
+                if r == 0:
+                    self.out("Infinite solutionn!")
+                    self.phase = 3
+                    self.hist.append((r, c))
+                    return 0
+                if probe: probe.pivot(self, r, c)
+                elif r > 0: self._pivot(r,c) #r<0: x[c] to its upper bound
+                self.interact(max(r, 0))
+                maxit -= 1
+            self.out("Hit max iteration!")
+            self.phase = - self.phase #may continue
+            return 0
+        finally:
+            if probe: probe.end_phase(self)
 
     def _transfer_to_phase_II(self):
         if self.phase != 1: return False
-        if self.rows[0][0] != 0:
-            puts("Not feasible to start Phase II!")
+        if abs(self.rows[0][0]) > self.feas_tol:
+            self.out("Not feasible to start Phase II!")
             return False 
-        puts('''\n***** Transition to phase II *****\n''')
+        self.out('''\n***** Transition to phase II *****\n''')
         #make sure no artificial variable is in the base
         for r, b in enumerate(self.base[:]):
             if self.vars[b][0] != '@': continue #not artificial
             #degenerated(artificials in the base), swap them out
-            for c, v in enumerate(self.rows[r]):
-                #v<0 is OK! this is only true when degenerated.
-                if c in self.base or v==0: continue
+            row = self.rows[r]
+            for c in range(len(self.vars)):
+                v = row[c] #v<0 is OK! only true when degenerated.
+                if c in self.baserow or abs(v) <= self.feas_tol: continue
                 #don't swap in an artificial one
                 if self.vars[c][0] == '@': continue
                 #swap in a non-base, non-artificial variable!
@@ -669,18 +1663,26 @@ Type 'undo' to undo, type 'peek' to peek at previous tableaux.
             if v[0]!='@': continue
             self.cols -= 1
         #update the sigma
-        sigma = self.fobj[:] #NOTE: may need update
+        self._set_objective(self._flip_cost(self.fobj))
+        self.phase = 2
+        self.hist_I = self.hist #save history
+        self.hist = [] #clear history
+        return True
+
+    def _warm_start(self, maxit):
+        'pivots before the simplex method starts, see HybridTableau.'
+
+    def _set_objective(self, cost):
+        'sigma row for the cost, priced out by the base.'
+        sigma = cost[:] #NOTE: may need update
         for r, b in enumerate(self.base):
             e = sigma[b]
             if r == 0 or e==0: continue
             sigma = [c-e*v for c,v in zip(sigma, self.rows[r])]
         self.rows[0] = sigma
-        self.phase = 2
-        self.hist_I = self.hist #save history
-        self.hist = [] #clear history
-        return True
 
     def _init_base(self):
+        self.flipped = set()
         self.rows = self.origrows[:]
         for i, row in enumerate(self.rows):
             if not row: continue
@@ -688,8 +1690,8 @@ Type 'undo' to undo, type 'peek' to peek at previous tableaux.
         self.m = len(self.rows)-1 #excluding objective row
         self.b = [v[0] for v in self.rows if v] #initial b
         nvars = len(self.vars)
-        self.base = list(range(nvars-self.m-1, nvars))
-        self.base[0] = 0 #reserved for the objective row
+        self.base = self.unit[:] #base[0] for the objective row
+        self._index_base()
         self.cols = nvars #0 for RHS
         for vi in range(nvars-self.m, nvars):
             if self.vars[vi][0]=='@': break
@@ -707,9 +1709,14 @@ Type 'undo' to undo, type 'peek' to peek at previous tableaux.
             sigma = [c+v for c,v in zip(sigma,row)]
         self.rows[0] = sigma
 
-    def solve(self, maxit=-1):
+    def solve(self, maxit=-1, save=True):
+        'save: offer to save the work if not optimal.'
         self._init_base()
+        self._reset_pricing()
         self.ihelp()
+        if self.interactive and self.export is None:
+            self.export = TableBuffer() #every tableau, for savework
+        self._warm_start(maxit)
         opt = self._phase_solve(maxit)
 
         if self._transfer_to_phase_II():
@@ -718,73 +1725,249 @@ Type 'undo' to undo, type 'peek' to peek at previous tableaux.
         if opt==2: #optimality?
             return True
 
-        self.savework()
-
-    def _phase_follow(self, hist):
-        puts("Start Phase %s."%[0,'I','II'][self.phase])
-        self.display(itn=0, asformula=True)
-        for itn, (vout, c) in enumerate(hist):
-            r = self.base.index(vout)
-            if c == 0:
-                puts("Found optimal solution at iteration [%i]!"
-                      % len(self.hist))
-                if self.degenerated: self._restore()
-                self.hist.append((r, c))
-                return self.phase
-            if r == 0:
-                puts("Infinite solutionn!")
-                self.phase = 3
-                self.hist.append((r, c))
-                return 0
-            self._pivot(r,c)
-            self.display(r, 1+itn, asformula=True)
-        self.phase = - self.phase #may continue
-        return 0
-
-    def auto_replay(self): #to save to excel file
-        self._init_base() #phase?
-
-        hist = self.hist_I if self.phase==1 else self.hist
-        saved_hist = self.hist
-        self.hist = []
-
-        opt = self._phase_follow(hist)
-        if self._transfer_to_phase_II():
-            opt = self._phase_follow(saved_hist)
-
-        assert self.hist == saved_hist, "Inconsistency in history!"
+        if save: self.savework()
+
+    def solve_scenarios(self, bs=None, cs=None, workers=0):
+        '''solve the model for each scenario, the matrix is built once.
+bs: b of each scenario, one number for each constraint of the model,
+cs: the objective of each, {variable: coefficient} with the others
+as in the model. None keeps the model's b or objective. A scenario
+starts from the optimal base of the one before: the dual simplex
+method takes it to the new b, then the primal simplex method to
+the new objective. Returns what getSolution gives for each, None
+if no optimal solution, and prints nothing. The tableau is left
+optimal for the model, if it is. workers: size of a process pool, each worker
+solves a run of the scenarios, see _solve_scenarios.'''
+        n = len(bs if bs is not None else cs)
+        if bs is None: bs = [None]*n
+        if cs is None: cs = [None]*n
+        assert len(bs) == len(cs), "As many b as objectives!"
+        if workers:
+            from concurrent.futures import ProcessPoolExecutor #Python 3
+            model, k = self.model.compile(), -(-n//workers) #run length
+            with ProcessPoolExecutor(workers) as pool:
+                runs = [pool.submit(_solve_scenarios, model, self.engine,
+                                    bs[i:i+k], cs[i:i+k])
+                        for i in range(0, n, k)]
+                return [soln for run in runs for soln in run.result()]
+        saved = (self.out, self.interactive, self.hist, self.snaps,
+                 self.snaps_hist, [row[0] for row in self.origrows[1:]],
+                 self.fobj, self.export, self.probe)
+        self.out, self.interactive = NullOutput(), False
+        self.export = self.probe = None #the scenarios are not the model's
+        nb = len(self.model.sts)-1 #bound rows come after, unchanged
+        obj, rows, state = self.model.sts[0], self.origrows[1:], None
+        try:
+            if getattr(self, 'phase', 0) == 2 or self.solve(save=False):
+                state = self._state()
+            solns = []
+            for b, c in zip(bs, cs):
+                if not state: #no base to start from
+                    solns.append(self._scenario(b, c))
+                    continue
+                if self.phase != 2: #back to the optimal base of the model
+                    self._set_state(state)
+                    self.fobj, self.phase = saved[6], 2
+                self.hist = []
+                tb = saved[5] #b of the tableau
+                if b is not None: #negated and shifted as in __init__
+                    assert len(b) == nb, "One b for each constraint!"
+                    tb = [(-fract(v) if i in self.negated else fract(v)) -
+                          sum(row[j]*l for j, l in enumerate(self.lb) if l)
+                          for i, (v, row) in enumerate(zip(b, rows), 1)]
+                    tb += saved[5][nb:]
+                try: self._set_b(tb)
+                except ValueError: #not in this tableau, see IntegerTableau
+                    solns.append(self._scenario(b, c))
+                    continue
+                fobj = saved[6]
+                if c is not None:
+                    coefs = dict(obj[0])
+                    coefs.update(c)
+                    fobj = self._cost_row(coefs, obj[2])
+                #new b: the base stays dual feasible
+                self._restore_rhs()
+                self._set_objective(self._flip_cost(self.fobj))
+                if not self._dual_simplex(): self.phase = 1 #infeasible
+                self.fobj = fobj #new objective: the base is primal feasible
+                if self.phase == 2:
+                    self._set_objective(self._flip_cost(fobj))
+                    self._phase_solve(-1)
+                solns.append(self.getSolution() if self.phase == 2 else None)
+            return solns
+        finally:
+            (self.out, self.interactive, self.hist, self.snaps,
+             self.snaps_hist, b, self.fobj, self.export, self.probe) = saved
+            self._set_b(b)
+            if state:
+                self._set_state(state)
+                self._set_objective(self._flip_cost(self.fobj))
+                self.phase = 2
+
+    def _scenario(self, b, c):
+        'solution of a new tableau with b and c, see solve_scenarios.'
+        prob = copy(self.model)
+        prob.sts = prob.sts[:]
+        if b is not None:
+            for i, v in enumerate(b, 1):
+                t, r, _, name = prob.sts[i]
+                prob.sts[i] = t, r, v, name
+        if c is not None:
+            t, r, b0, name = prob.sts[0]
+            t = dict(t)
+            t.update(c)
+            prob.sts[0] = t, r, b0, name
+        tab = Tableau(prob, False, self.engine, out=self.out)
+        return tab.getSolution() if tab.solve(save=False) else None
+
+    def branch(self, v, lower=None, upper=None):
+        '''copy of the optimal tableau with lower <= v <= upper,
+reoptimized by the dual simplex method from the same base.
+The engine must keep upper bounds out of the matrix.'''
+        assert self.phase == 2 and self.upper_bounds, "Can't branch!"
+        j = self.col[v]
+        tab = copy(self)
+        tab.rows = self._copy_rows()
+        tab.origrows = [row and copy(row) for row in self.origrows]
+        tab.fobj, tab.b = copy(self.fobj), copy(self.b)
+        tab.base, tab.lb, tab.ub = self.base[:], self.lb[:], self.ub[:]
+        tab._index_base()
+        tab.flipped, tab.hist = set(self.flipped), self.hist[:-1]
+        tab._reset_pricing()
+        l, u = self.lb[j], self.ub[j]
+        if u is not None: u += l
+        if lower is not None: l = max(l, lower)
+        if upper is not None: u = upper if u is None else min(u, upper)
+        if u is not None and l > u: #empty bounds
+            tab.phase = 1
+            return tab
+        tab._set_bounds(j, l, u)
+        if tab._dual_simplex(): tab.phase = 2
+        else: tab.phase = 1 #infeasible
+        return tab
+
+    def _copy_rows(self):
+        return [copy(row) for row in self.rows]
+
+    def _entries(self):
+        'all entries of the tableau, see Probe.bit_lengths.'
+        return (v for row in self.rows for v in row)
+
+    def _set_bounds(self, j, l, u):
+        '''new bounds l <= x[j] <= u, tighter ones. The shift of x[j]
+is substituted into the RHS, the base is kept.'''
+        d = l - self.lb[j] #x' = x - l
+        #~x = u - x, with the lower bound moved in
+        shift = self.lb[j] + self.ub[j] - u if j in self.flipped else d
+        for row in self.rows:
+            if row[j]: row[0] -= row[j]*shift
+        if d:
+            for i, row in enumerate(self.origrows):
+                if not row or not row[j]: continue
+                row[0] -= row[j]*d
+                self.b[i-1] -= row[j]*d
+            self.fobj[0] -= self.fobj[j]*d
+        self.lb[j], self.ub[j] = l, None if u is None else u-l
+        self.bounded = self.bounded or u is not None
+
+    def _set_b(self, b):
+        '''b of the rows of the tableau, with the lower bounds in and
+negated as the rows. The RHS is B^{-1} b after _restore_rhs.'''
+        for row, v in zip(self.origrows[1:], b): row[0] = v
+        self.b = list(b)
+
+    def _dual_simplex(self, maxit=-1):
+        '''the base stays dual feasible (no sigma > 0), pivot out the
+basic variables that are out of their bounds. False if infeasible.'''
+        self.out("Start dual simplex.")
+        probe = self.probe
+        if probe: probe.begin_phase(self, 'dual')
+        self.interact()
+        try:
+            while maxit:
+                r = self._dual_row()
+                if r == 0:
+                    self.out("Found optimal solution at iteration [%i]!"
+                          % len(self.hist))
+                    self.hist.append((0, 0))
+                    return True
+                if self.rows[r][0] > 0: #above its upper bound
+                    self._complement(self.base[r])
+                c = self._dual_col(r)
+                if c == 0:
+                    self.out("Infeasible!")
+                    return False
+                if probe: probe.pivot(self, r, c)
+                else: self._pivot(r, c)
+                self.interact(r)
+                maxit -= 1
+            self.out("Hit max iteration!")
+            return False
+        finally:
+            if probe: probe.end_phase(self)
+
+    def _dual_row(self):
+        'the basic variable most out of its bounds, 0 if none.'
+        best, r = self.feas_tol, 0
+        for i in range(1, self.m+1):
+            x, u = self.rows[i][0], self.ub[self.base[i]]
+            out = -x if u is None or x < u else x-u
+            if out > best: best, r = out, i
+        return r
 
-        if opt!=2: return #optimality?
-        if self.phase != 2:
-            return puts("No optimal solution")
-        #phase 2 optimality
-        self.sensit()
-        self.printSoln("%s\t=%s\t=%s")
-        self.printCons("%s\t=%s\t=%s")
-        self.printCoefRange("%s\t=%s\t=%s\t=%s")
-        self.printConsRange("%s\t=%s\t=%s\t=%s")
+    def _dual_col(self, r):
+        'entering column of the dual ratio test, smallest index if tie.'
+        row, sigma = self.rows[r], self.rows[0]
+        best, c = None, 0
+        for i in range(1, self.cols):
+            a = row[i]
+            if a >= -self.feas_tol: continue
+            ratio = sigma[i]/a
+            if best is None or ratio < best: best, c = ratio, i
+        return c
+
+    def write(self, export):
+        '''the model, the tableau as it is now and the reports if it is
+optimal to export, a TableWriter. Nothing is solved again: every
+tableau is written instead if self.export is a TableBuffer, as in
+an interactive solve; or set export before the solve, see interact.'''
+        out, self.out = self.out, export
+        try:
+            export(self.text)
+            if isinstance(self.export, TableBuffer):
+                self.export.write_to(export)
+            else: export.table(self._table())
+            if self.phase != 2: return export("No optimal solution")
+            self.sensit()
+            self.printSoln("%s\t%s\t%s")
+            self.printCons("%s\t%s\t%s")
+            self.printCoefRange("%s\t%s\t%s\t%s")
+            self.printConsRange("%s\t%s\t%s\t%s")
+        finally:
+            self.out = out
 
     def savework(self):
-        global Infty
+        '''save to name.csv, name.tsv or name.xml (SpreadsheetML),
+which is the default.'''
         savef = input("Save to file (return to skip):").strip()
         if not savef: return
-        savef = "%s.xls"%savef
-        with open(savef, "wt") as saved:
-            redirect = sys.stdout
-            sys.stdout = saved
-            Infty = "B1" #see below
-            puts("NOTE:\tInfty\tdenotes infinity.") #in B1
-            puts("HINT: You can format numbers as fractions in excel.")
-            puts(self.text)
-            self.auto_replay()
-            puts()
-            sys.stdout = redirect
-            Infty = "Infty" #restore
-        puts("saved to file: %s"%savef)
+        ext = os.path.splitext(savef)[1].lower()
+        if ext not in ('.csv', '.tsv', '.xml'):
+            savef, ext = savef+'.xml', '.xml'
+        try: #csv needs newline='', or Windows gets blank rows
+            saved = open(savef, 'w', newline='')
+        except TypeError: #Python 2
+            saved = open(savef, 'wb')
+        with saved:
+            if ext == '.xml': export = SpreadsheetWriter(saved)
+            else: export = TableWriter(saved, ',' if ext == '.csv' else '\t')
+            self.write(export)
+            export.close()
+        self.out("saved to file: %s"%savef)
 
     def report(self):
         if self.phase != 2:
-            puts("No optimal solution")
+            self.out("No optimal solution")
             return self.savework()
 
         #phase 2 optimality
@@ -800,22 +1983,32 @@ Type 'undo' to undo, type 'peek' to peek at previous tableaux.
         self.savework()
 
     def sensit(self): #sensitivity computations
-        c = [self.fobj[i] for i in self.base if i]
-        tiB = [self.rows[r][-self.m:] for r in range(1,self.m+1)]
-        tiB = list(zip(*tiB)) #transposed
+        c = self._flip_cost(self.fobj)
+        c = [c[i] for i in self.base if i]
+        tiB = list(zip(*self._binv())) #transposed
         self.shadow = [sum(ci*bi for ci, bi in zip(c, tiB[i]))
              for i in range(self.m)]
         if self.obj_dir<0: #assuming positive RHS
             self.shadow = [-s for s in self.shadow]
+        #the RHS as given, before lower bounds moved in
+        self.rhs = [b + sum(row[j]*l for j, l in enumerate(self.lb) if l)
+                    for b, row in zip(self.b, self.origrows[1:])]
         #now we do range of RHS
         sig = [v[0] for i, v in enumerate(self.rows) if i]
+        ubs = [self.ub[i] for i in self.base[1:]]
         self.bu, self.bl = [], []
         for r in range(self.m):
-            #sig + inc*tiB[r] >= 0
-            vv = [sv/av for sv,av in zip(sig,tiB[r]) if av<0]
-            u =  self.b[r] - max(vv) if vv else Infty
-            vv = [sv/av for sv,av in zip(sig,tiB[r]) if av>0]
-            l =  self.b[r] - min(vv) if vv else Infty
+            #0 <= sig + inc*tiB[r] <= ub
+            up, down = [], [] #how far the RHS may go
+            for sv, av, ub in zip(sig, tiB[r], ubs):
+                if av < 0:
+                    up.append(-sv/av)
+                    if ub is not None: down.append((sv-ub)/av)
+                elif av > 0:
+                    down.append(sv/av)
+                    if ub is not None: up.append((ub-sv)/av)
+            u =  self.rhs[r] + min(up) if up else self.infty
+            l =  self.rhs[r] - min(down) if down else self.infty
             self.bu.append(u)
             self.bl.append(l)
             
@@ -824,103 +2017,1437 @@ Type 'undo' to undo, type 'peek' to peek at previous tableaux.
     def getSolution(self):
         def getX(i, v):
             if i==0: return '(Obj)', self.getObj()
-            if i in self.base:
-                return v,self.rows[self.base.index(i)][0]
-            if i+1 < len(self.vars) and\
-               self.vars[i+1][0]=='!' and i+1 in self.base:
-                    return v,-self.rows[self.base.index(i)][0]
-            return v, fract(0)
+            x = self._activity(i)
+            if i+1 < len(self.vars) and self.vars[i+1][0]=='!':
+                x -= self._activity(i+1) #free variable
+            return v, x
         return [getX(i,v) for i,v in enumerate(self.vars)
                 if v[0] not in '#@$!']
 
+    def _activity(self, i):
+        'value of x[i], with its bounds.'
+        r = self.baserow.get(i)
+        x = self.rows[r][0] if r else fract(0)
+        if i in self.flipped: x = self.ub[i] - x
+        return self.lb[i] + x
+
     def printSoln(self, tpl = "%s\t\t%s\t\t%s"):
-        puts("Optimal objective value: %s"%str(self.getObj()))
-        puts("Optimal Solution:")
-        puts("Variable\tActivity\tReduced Cost")
+        self.out("Optimal objective value: %s"%str(self.getObj()))
+        self.out("Optimal Solution:")
+        self.out("Variable\tActivity\tReduced Cost")
         #reduced cost: what if its nonnegative bound is reduced
         for i,v in enumerate(self.vars):
             if not i: continue
             if v[0] in '#@$': break
-            if i in self.base:
-                a = str(self.rows[self.base.index(i)][0])
-                d = '0'
-            else:
-                a = '0'
-                d = str(-self.rows[0][i])
-            puts(tpl%(v, a, d))
+            a = str(self._activity(i))
+            if i in self.baserow: d = '0'
+            elif i in self.flipped: d = str(self.rows[0][i])
+            else: d = str(-self.rows[0][i])
+            self.out(tpl%(v, a, d))
         #mylist.sub( :x => x+2 )
 
     def getCoefRange(self, i):
         a = self.fobj[i]
-        if i in self.base:
+        if i in self.baserow:
             sig = self.rows[0]
-            row = self.rows[self.base.index(i)]
+            row = self.rows[self.baserow[i]]
+            if i in self.flipped: #its cost is -a in the tableau
+                row = [-row[c] for c in range(self.cols)]
             #sig[c] - row[c]*inc <= 0
-            ubs = [sig[c]/row[c] for c in range(1,self.cols) if row[c] < 0]
-            u = a + min(ubs) if ubs else Infty
+            ubs = [sig[c]/row[c] for c in range(1,self.cols)
+                   if (c!=i and row[c] < 0)]
+            u = a + min(ubs) if ubs else self.infty
             #sig[c] + row[c]*dec <= 0
             ubs = [sig[c]/row[c] for c in range(1, self.cols)
                    if (c!=i and row[c] > 0)]
-            l = a + max(ubs) if ubs else Infty 
+            l = a + max(ubs) if ubs else self.infty 
+        elif i in self.flipped: #stays at the upper bound
+            l = a + self.rows[0][i]
+            u = self.infty
         else:
-            l = Infty
+            l = self.infty
             u = a - self.rows[0][i]
         def neg(u): return u if type(u) is str else -u
         return (l, a, u) if self.obj_dir>0 else (neg(u),-a,neg(l))
 
     def printCoefRange(self, tpl="%s\t\t%s\t\t%s\t\t%s"):
-        puts("Sensitivity on coefficients:")
-        puts("Variable\tLower Bound\tCoefficient\tUpper Bound")
+        self.out("Sensitivity on coefficients:")
+        self.out("Variable\tLower Bound\tCoefficient\tUpper Bound")
         for i,v in enumerate(self.vars):
             if not i: continue
             if v[0] in '#@$': break
             l, a, u = self.getCoefRange(i)
-            puts(tpl%(v, l, a, u))
+            self.out(tpl%(v, l, a, u))
 
     def printCons(self, tpl="%s\t%s\t\t%s"): #constraints
-        puts("Constraint Activities:")
-        puts("ID\tSlack/Surplus\tShadow Price")
+        self.out("Constraint Activities:")
+        self.out("ID\tSlack/Surplus\tShadow Price")
         for i in range(1,self.m+1):
-            vi = 0
-            if '#%i'%i in self.vars: #surplus
-                vi = self.vars.index('#%i'%i)
-            elif '$%i'%i in self.vars: #slack
-                vi = self.vars.index('$%i'%i)
-            if vi and vi in self.base:
-                v = self.rows[self.base.index(vi)][0]
-            else: v = 0 #nonbasic or artificial
+            r = self.baserow.get(self.slackcol[i]) #surplus or slack
+            v = self.rows[r][0] if r else 0 #nonbasic or artificial
             rname = self.rownames[i]
-            puts(tpl%(rname if rname else i,
+            self.out(tpl%(rname if rname else i,
                                  v,self.shadow[i-1]))
 
     def printConsRange(self, tpl="%s\t%s\t\t%s\t\t%s"): #constraints
-        puts("Sensitivity on R.H.S.:")
-        puts("ID\tLower Bound\tCurrent Value\tUpper Bound")
+        self.out("Sensitivity on R.H.S.:")
+        self.out("ID\tLower Bound\tCurrent Value\tUpper Bound")
         for i in range(self.m):
             rname = self.rownames[i+1]
-            puts(tpl%(rname if rname else i+1,
-                self.bl[i], self.b[i], self.bu[i]))
+            self.out(tpl%(rname if rname else i+1,
+                self.bl[i], self.rhs[i], self.bu[i]))
+
+    def _param_begin(self):
+        'the optimal tableau to go back to, see _param_end.'
+        assert self.phase == 2, "No optimal tableau!"
+        saved = (self._state(), self.hist, self.snaps, self.snaps_hist,
+                 self.flat_wolf, self.virtual_perturbation)
+        #plain smallest index on ties, the RHS is not perturbed
+        self.hist, self.flat_wolf, self.virtual_perturbation = [], 0, 0
+        return saved
+
+    def _param_end(self, saved):
+        (state, self.hist, self.snaps, self.snaps_hist,
+         self.flat_wolf, self.virtual_perturbation) = saved
+        self._set_state(state)
+        self._set_objective(self._flip_cost(self.fobj))
+
+    def _cost_row(self, coefs, const=0):
+        '''row of {variable: coefficient} as fobj is made from the
+objective: maximized, with the lower bounds moved into the constant.'''
+        col = dict((v, j) for j, v in enumerate(self.vars))
+        terms = {}
+        for v, a in coefs.items():
+            if v not in col: raise ValueError("unknown variable: "+v)
+            terms[v] = self.obj_dir*fract(a)
+            if v in self.model.fvset: terms['!'+v] = -terms[v]
+        const = self.obj_dir*fract(const) - \
+                sum(a*self.lb[col[v]] for v, a in terms.items())
+        return self._make_row(terms, col, const)
+
+    def _basis(self):
+        'names of the basic variables, ~x if complemented.'
+        return ['~'+self.vars[b] if b in self.flipped else self.vars[b]
+                for b in self.base[1:]]
+
+    def parametricRHS(self, db, tmax=None):
+        '''b + t*db for 0 <= t <= tmax (no limit if None), db has one
+change for each constraint of the model. Returns the intervals of t
+as (t0, t1, obj, slope, base): the base stays optimal from t0 to t1,
+where the objective is obj + slope*(t-t0). t1 is infty past the last
+breakpoint; a last t1 below tmax means no solution past it.
+The RHS B^{-1} b + t B^{-1} db is not written into the tableau,
+the base changes by dual simplex pivots and is restored in the end.'''
+        n = len(self.model.sts)-1 #bound rows come after, unchanged
+        assert len(db) == n, "One change for each constraint!"
+        db = [-fract(e) if i in self.negated else fract(e)
+              for i, e in enumerate(db, 1)] + [0]*(self.m-n)
+        saved = self._param_begin()
+        try:
+            t, segs, ub, tol = fract(0), [], self.ub, self.feas_tol
+            while True:
+                rows, base = self.rows, self.base
+                #the change of the RHS, of row 0 too, is B^{-1} db
+                d = [sum(rows[i][u]*e for u, e in zip(self.unit[1:], db)
+                         if e) for i in range(self.m+1)]
+                t1, r = tmax, 0 #basic variables to 0 or up to ub
+                for i in range(1, self.m+1):
+                    x, e, u = rows[i][0], d[i], ub[base[i]]
+                    if e < -tol: s = -x/e
+                    elif e > tol and u is not None: s = (u-x)/e
+                    else: continue
+                    s = max(s, t)
+                    if t1 is None or s < t1 or \
+                       s == t1 and r and base[i] < base[r]: t1, r = s, i
+                if segs and segs[-1][0] == t: segs.pop() #no length
+                segs.append((t, self.infty if t1 is None else t1,
+                            -self.obj_dir*(rows[0][0] + t*d[0]),
+                            -self.obj_dir*d[0], self._basis()))
+                if not r: return segs #at tmax, or no limit
+                t = t1
+                if d[r] > 0: self._complement(base[r], False) #up to ub
+                c = self._dual_col(r)
+                if c == 0: return segs #infeasible past t
+                self._pivot(r, c, False)
+        finally:
+            self._param_end(saved)
+
+    def parametricObj(self, dc, tmax=None):
+        '''c + t*dc for 0 <= t <= tmax (no limit if None), dc as
+{variable: change}. Returns the intervals as parametricRHS does,
+a last t1 below tmax means the objective is unbounded past it.
+Sigma is priced for c and for dc, the base changes by primal
+simplex pivots and is restored in the end.'''
+        dcost = self._cost_row(dc)
+        saved = self._param_begin()
+        try:
+            t, segs, tol = fract(0), [], self.opt_tol
+            while True:
+                self._set_objective(self._flip_cost(dcost))
+                ds = [self.rows[0][j] for j in range(self.cols)]
+                self._set_objective(self._flip_cost(self.fobj))
+                sigma = self.rows[0]
+                t1, c = tmax, 0 #nonbasic sigma up to 0
+                for j in range(1, self.cols):
+                    if ds[j] <= tol or j in self.baserow: continue
+                    s = max(-sigma[j]/ds[j], t)
+                    if t1 is None or s < t1: t1, c = s, j
+                if segs and segs[-1][0] == t: segs.pop() #no length
+                segs.append((t, self.infty if t1 is None else t1,
+                            -self.obj_dir*(sigma[0] + t*ds[0]),
+                            -self.obj_dir*ds[0], self._basis()))
+                if not c: return segs #at tmax, or no limit
+                t = t1
+                r = self._ratio_test(c)
+                if r == 0: return segs #unbounded past t
+                if r > 0: self._pivot(r, c, False) #r<0: x[c] to its ub
+        finally:
+            self._param_end(saved)
+
+    def printParametric(self, segs, tpl="%s\t%s\t\t%s\t\t%s\t\t%s"):
+        'the intervals of parametricRHS or parametricObj.'
+        self.out("Parametric analysis:")
+        self.out("From\tTo\t\tObjective\tSlope\t\tBase")
+        for t0, t1, obj, slope, base in segs:
+            self.out(tpl%(t0, t1, obj, slope, ' '.join(base)))
+
+class FloatTableau(Tableau):
+    '''Tableau kept in a 2-D numpy array of float64.
+Pivoting, the ratio test and pricing are vectorized.
+feas_tol: smallest pivot element, and how far RHS may be off zero.
+opt_tol: smallest sigma that counts as an improvement.
+zero_tol: round-off below it is flushed to zero after a pivot.'''
+    engine = 'float'
+
+    def __init__(self, prob, interactive=True, engine=None,
+                 feas_tol=1e-9, opt_tol=1e-9, zero_tol=1e-12, out=None):
+        if numpy is None:
+            raise ImportError("The float engine needs numpy.")
+        Tableau.__init__(self, prob, interactive, out=out)
+        self.feas_tol, self.opt_tol = feas_tol, opt_tol
+        self.zero_tol = zero_tol
+
+    def _init_base(self):
+        Tableau._init_base(self) #in fractions, then convert
+        self.rows = numpy.array(self.rows, dtype=float)
+        self.b = numpy.array(self.b, dtype=float)
+
+    def _pivot(self, row, col, hist=True):
+        self._pre_pivot(row, col, hist)
+        rows = self.rows
+        prow = rows[row] / rows[row, col]
+        ecol = rows[:, col].copy()
+        ecol[row] = 0
+        nz = numpy.flatnonzero(ecol) #rows to eliminate
+        block = rows[nz] - numpy.outer(ecol[nz], prow)
+        block[numpy.abs(block) < self.zero_tol] = 0
+        block[:, col] = 0 #exact zeros in the pivot column
+        rows[nz] = block
+        rows[row] = prow
+        rows[row, col] = 1
+        if hist: self.hist.append((self.base[row], col))
+        self._set_basic(row, col) #must go after history update
+
+    def _largest_sigma(self):
+        if self.cols < 2: return 0 #no columns, as after a presolve
+        sigma = self.rows[0, 1:self.cols]
+        i = int(numpy.argmax(sigma)) #the first one if tie
+        return i+1 if sigma[i] > self.opt_tol else 0
+
+    def _smallest_index(self):
+        idx = numpy.flatnonzero(self.rows[0, 1:self.cols] > self.opt_tol)
+        return int(idx[0])+1 if len(idx) else 0
+
+    _auto_choice = _smallest_index
+
+    def _weighted_choice(self, kind):
+        if self.cols < 2: return 0
+        if self.weighting != kind: self._init_weights(kind)
+        sigma = self.rows[0, 1:self.cols]
+        score = numpy.where(sigma > self.opt_tol,
+                            sigma*sigma/self.weights[1:self.cols], 0)
+        i = int(numpy.argmax(score)) #the first one if tie
+        return i+1 if score[i] > 0 else 0
+
+    def _scan(self):
+        n = self.cols-1
+        if not n: return []
+        order = (numpy.arange(n) + self.scan_at) % n + 1
+        sigma = self.rows[0, order]
+        hit = numpy.flatnonzero(sigma > self.opt_tol)[:self.partial_size]
+        if len(hit): self.scan_at = int(order[hit[-1]]) % n
+        return [(sigma[i], int(order[i])) for i in hit]
+
+    def _init_weights(self, kind):
+        if kind == 'steepest_edge':
+            w = 1 + (self.rows[1:]**2).sum(axis=0)
+        else: w = numpy.ones(len(self.vars))
+        self.weights, self.weighting = w, kind
+
+    def _update_weights(self, row, col):
+        w, wq = self.weights, self.weights[col]
+        p = self.rows[row, col]
+        a = self.rows[row]/p
+        if self.weighting == 'devex':
+            numpy.maximum(w, a*a*wq, out=w)
+        else:
+            kappa = self.rows[1:, col].dot(self.rows[1:])
+            numpy.maximum(w - 2*a*kappa + a*a*wq, 1 + a*a, out=w)
+        w[self.base[row]] = max(wq/(p*p), 1) #the leaving variable
+
+    def _best_objective(self):
+        sigma = self.rows[0]
+        cand = numpy.flatnonzero(sigma[1:self.cols] > self.opt_tol) + 1
+        if not len(cand): return 0 #reached optimality
+        lhs = self.rows[1:, cand]
+        rhs = self.rows[1:, :1]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            ratio = numpy.where(lhs > self.feas_tol, rhs/lhs, numpy.inf)
+        mrat = ratio.min(axis=0) #ratio test for all columns at once
+        infty = numpy.isinf(mrat)
+        if infty.any(): return int(cand[numpy.argmax(infty)])
+        return int(cand[numpy.argmax(mrat*sigma[cand])])
+
+    def _pivot_row(self, col):
+        '''always use "smallest_index" to break tie.'''
+        if self.degenerated:
+            rows = numpy.array(self.degenerated)
+            if self.out:
+                self.out("degenerated rows:"+ repr(self.degenerated))
+        else: rows = numpy.arange(1, self.m+1)
+        lhs = self.rows[rows, col]
+        keep = lhs > self.feas_tol
+        if not keep.any():
+            if not self.degenerated: return 0 #infinite solution
+            #OK, we found a way out of degeneracy!
+            self._restore()
+            return self._pivot_row(col)
+        rows, lhs = rows[keep], lhs[keep]
+        rhs = self.rows[rows, 0]
+        ratio = rhs / lhs
+        mrat = ratio.min()
+        ties = ratio <= mrat + self.feas_tol
+        needcare = mrat <= self.feas_tol and ties.sum() > 1
+
+        if ties.sum() > 1 and self.lexicographic:
+            return self._lex_row(col, rows[ties])
+
+        if needcare and self.virtual_perturbation:
+            zero = rhs <= self.feas_tol
+            return int(rows[zero][numpy.argmin(lhs[zero])])
+
+        if needcare and self.flat_wolf:
+            if not self.degenerated:
+                self.vobj = self.rows[0, 0] #remember objective value
+                rhs = self.rows[1:, 0]
+                self.degenerated = list(
+                    numpy.flatnonzero(abs(rhs) <= self.feas_tol) + 1)
+            for i in self.degenerated:
+                if self.rows[i, 0] > self.feas_tol: continue
+                self.rows[i, 0] = self._below_ub(i, 1.0/randint(2,10))
+            return self._pivot_row(col)
+
+        rows = rows[ties]
+        return int(rows[numpy.argmin(numpy.array(self.base)[rows])])
+
+    def _lex_row(self, col, ties):
+        rows = self.rows
+        q = rows[numpy.ix_(ties, self.unit[1:])] / rows[ties, col][:, None]
+        for k in range(q.shape[1]):
+            if len(ties) < 2: break
+            keep = q[:, k] <= q[:, k].min() + self.feas_tol
+            ties, q = ties[keep], q[keep]
+        return int(ties[0])
+
+    def _restore_rhs(self):
+        self.rows[1:, 0] = self._binv().dot(numpy.array(self._rhs(), float))
+
+    def _copy_rows(self):
+        return self.rows.copy()
+
+    def _binv(self):
+        return self.rows[1:, self.unit[1:]]
+
+    def getSolution(self):
+        return [(v, float(x)) for v, x in Tableau.getSolution(self)]
+
+class HybridTableau(Tableau):
+    '''Tableau solved in floats first, then in fractions: the final
+base of a FloatTableau is pivoted in exactly (its bound flips too),
+and the simplex method goes on in fractions from there, so only the
+pivots the floats got wrong are made exactly. A base that is not
+feasible in fractions is repaired by the dual simplex method if its
+sigma allows, or else the solve starts over. The results and reports
+are exact, as with the fraction engine. Without numpy it is the
+fraction engine.'''
+    engine = 'hybrid'
+
+    def _warm_start(self, maxit):
+        if numpy is None: return
+        probe = self.probe
+        if probe: probe.begin_phase(self, 'float')
+        try:
+            ftab = FloatTableau(self.model, False, out=NullOutput())
+            ftab.meth = self.meth
+            ftab.solve(maxit, save=False)
+            self.out("Float solve ended in phase %i, pivot in its base."
+                     % ftab.phase)
+            #numpy ints would make floats of fractions
+            for c in sorted(ftab.flipped): self._complement(int(c))
+            self._crash([int(c) for c in ftab.base[1:]])
+        finally:
+            if probe: probe.end_phase(self)
+        if self._feasible(): return self._to_phase_II()
+        if self._to_phase_II() and max(self.rows[0][1:self.cols]) <= 0:
+            self.out("Base not feasible, repair by dual simplex.")
+            if self._dual_simplex(maxit):
+                self.hist.pop() #not the end, see _phase_solve
+                return
+        self.out("Base not feasible, start over.")
+        self._init_base()
+        self._reset_pricing()
+        self.hist = []
+        self.__dict__.pop('hist_I', None)
+
+    def _crash(self, cols):
+        '''pivot the columns into the base, each in a row of a basic
+variable that is not one of them. A column left with no such row
+(the base is singular in fractions) is left out.'''
+        keep = set(cols)
+        for c in cols:
+            if c in self.baserow: continue
+            for r in range(1, self.m+1):
+                if self.base[r] not in keep and self.rows[r][c]: break
+            else: continue
+            if self.probe: self.probe.pivot(self, r, c)
+            else: self._pivot(r, c)
+
+    def _feasible(self):
+        'if the basic variables are within their bounds.'
+        for i in range(1, self.m+1):
+            x, u = self.rows[i][0], self.ub[self.base[i]]
+            if x < 0 or u is not None and x > u: return False
+        return True
+
+    def _to_phase_II(self):
+        '''phase II at once if no artificial variable is left in the
+base: phase I then has nothing to do. False if one is left.'''
+        if self.phase != 1: return self.phase == 2
+        if any(self.vars[b][0] == '@' for b in self.base[1:]): return False
+        self.hist.append((0, 0)) #end of phase I, a mark, see _step
+        return self._transfer_to_phase_II()
+
+class _SparseRow(dict):
+    'row of a SparseTableau, column -> value, zeros left out.'
+    def __missing__(self, c): return 0
+
+    def axpy(self, e, row):
+        'self -= e * row, touching only the nonzeros of row.'
+        for c, v in row.items():
+            v = self[c] - e*v
+            if v: self[c] = v
+            else: self.pop(c, None)
+
+class SparseTableau(Tableau):
+    '''Tableau with sparse rows, see _SparseRow.
+Slack, surplus and artificial columns leave most entries zero,
+the pivot only works through the nonzeros of the pivot row.'''
+    engine = 'sparse'
+
+    def _make_row(self, terms, col, rhs=0):
+        row = _SparseRow((col[v], c) for v, c in terms.items() if c)
+        if rhs: row[0] = rhs
+        return row
+
+    def _init_base(self):
+        self.flipped = set()
+        self.rows = [None]+[_SparseRow(row) for row in self.origrows[1:]]
+        self.m = len(self.rows)-1 #excluding objective row
+        self.b = [row[0] for row in self.rows[1:]] #initial b
+        self.base = self.unit[:] #base[0] for the objective row
+        self._index_base()
+        self.cols = len(self.vars) #0 for RHS
+        arts = _SparseRow((i, fract(-1)) for i, v in enumerate(self.vars)
+                          if v[0] == '@')
+        self.phase = 1 if arts else 2
+        self._set_objective(arts if arts else self.fobj)
+
+    def _set_objective(self, cost):
+        sigma = _SparseRow(cost)
+        for r, b in enumerate(self.base):
+            e = sigma[b]
+            if r == 0 or e==0: continue
+            sigma.axpy(e, self.rows[r])
+        self.rows[0] = sigma
+
+    def _pivot(self, row, col, hist=True):
+        self._pre_pivot(row, col, hist)
+        e = self.rows[row][col]
+        prow = _SparseRow((c, v/e) for c, v in self.rows[row].items() if v)
+        self.rows[row] = prow
+        for r, crow in enumerate(self.rows):
+            if r == row: continue
+            e = crow[col]
+            if e==0: continue
+            crow.axpy(e, prow)
+        if hist: self.hist.append((self.base[row], col))
+        self._set_basic(row, col) #must go after history update
+
+    def _min_ratios(self, cols, rows):
+        best = {}
+        for i in rows:
+            row = self.rows[i]
+            get = row.get #zeros are left out
+            self._ratio_pass(best, i, get(0, 0),
+                             ((c, get(c, 0)) for c in cols))
+        return self._ratio_result(best, cols)
+
+    def _entries(self): #zeros are left out
+        return (v for row in self.rows for v in row.values())
+
+    def _kappa(self, col):
+        kappa = [0]*len(self.vars)
+        for row in self.rows[1:]:
+            e = row[col]
+            if not e: continue
+            for c, v in row.items(): kappa[c] += e*v
+        return kappa
+
+class _RowView(object):
+    'row r of a _TableauView, entries come from the engine.'
+    def __init__(self, tab, r):
+        self.tab, self.r = tab, r
+
+    def __getitem__(self, c): return self.tab._entry(self.r, c)
+    def __setitem__(self, c, v): self.tab._set_entry(self.r, c, v)
+    def __len__(self): return len(self.tab.vars)
+    def __iter__(self): return iter(self.tab._full_row(self.r))
+
+class _TableauView(object):
+    '''rows of an engine that keeps its own storage.
+The engine gives a row by _row(r), an entry by _entry(r, c),
+a whole row by _full_row(r) and sets entries by _set_entry.'''
+    def __init__(self, tab):
+        self.tab = tab
+
+    def __len__(self): return self.tab.m+1
+    def __iter__(self): return (self[r] for r in range(len(self)))
+
+    def __getitem__(self, r):
+        if isinstance(r, slice):
+            return [self[i] for i in range(*r.indices(len(self)))]
+        return self.tab._row(r)
+
+class RevisedTableau(Tableau):
+    '''Revised simplex: origrows is never changed.
+The base is kept as a product-form eta file of B^{-1}, rebuilt
+from the basic columns every "refactor" pivots: B^{-1} = E P F,
+with the etas F of the refactorization, a row permutation P that
+keeps every basic variable in its row, and the etas E of the pivots
+since. Sigma and the entering column are computed on demand; other
+tableau rows are only computed when displayed or reported.'''
+    engine = 'revised'
+    upper_bounds = False #bounds become rows
+
+    def __init__(self, prob, interactive=True, engine=None, refactor=50,
+                 out=None):
+        Tableau.__init__(self, prob, interactive, out=out)
+        self.refactor = refactor #pivots between refactorizations
+        #sparse columns of [b A], with (row, value) pairs
+        self.A = [[] for v in self.vars]
+        for i, row in enumerate(self.origrows):
+            if not row: continue
+            for j, v in enumerate(row):
+                if v: self.A[j].append((i, fract(v)))
+        self.unitrow = dict((u, i) for i, u in enumerate(self.unit) if i)
+
+    @property
+    def rows(self): return self._rows
+
+    def _init_base(self):
+        self.m = len(self.origrows)-1 #excluding objective row
+        self.b = [row[0] for row in self.origrows[1:]] #initial b
+        self.base = self.unit[:]
+        self._index_base()
+        self.cols = len(self.vars) #0 for RHS
+        self.factor, self.perm = [], None #B^{-1}: starts with I
+        self.etas = []
+        self.xb = [0] + self.b #values of the basic variables
+        self._rows = _TableauView(self)
+        self._views = [_RowView(self, r) for r in range(self.m+1)]
+        self._clear()
+        if '@' not in ''.join(v[0] for v in self.vars[1:]):
+            self.phase = 2 #no artificial variables
+            return self._set_objective(self.fobj)
+        self.phase = 1
+        self._set_objective([fract(-1) if v[0]=='@' else fract(0)
+                             for v in self.vars])
+
+    def _snapshot(self):
+        'the etas are not changed once made, the lists are copied.'
+        return (self.factor[:], self.perm, self.etas[:], self.xb[:],
+                self.base[:], set(self.flipped))
+
+    def _load(self, snap):
+        factor, self.perm, etas, xb, base, flipped = snap
+        self.factor, self.etas, self.xb = factor[:], etas[:], xb[:]
+        self.base, self.flipped = base[:], set(flipped)
+        self._index_base()
+        self._clear()
+
+    def _clear(self):
+        'forget what was computed for the last base.'
+        self._entering = (None, None)
+        self._sigma_row = self._y = None
+        self._row_cache = {}
+
+    def _set_objective(self, cost):
+        self.cost = cost
+        self._sigma_row = self._y = None
+
+    def _ftran(self, col):
+        'B^{-1} a for the column a, given as (row, value) pairs.'
+        x = [fract(0)]*(self.m+1)
+        for i, v in col: x[i] = v
+        x = self._forward(x, self.factor)
+        if self.perm: x = [x[f] for f in self.perm]
+        return self._forward(x, self.etas)
+
+    def _btran(self, y):
+        'y B^{-1} for the row vector y.'
+        y = self._backward(y, self.etas)
+        if self.perm:
+            z = y[:]
+            for r, f in enumerate(self.perm): z[f] = y[r]
+            y = z
+        return self._backward(y, self.factor)
+
+    @staticmethod
+    def _forward(x, etas):
+        for r, p, eta in etas:
+            t = x[r]
+            if not t: continue
+            x[r] = t = t/p
+            for i, d in eta: x[i] -= d*t
+        return x
+
+    @staticmethod
+    def _backward(y, etas):
+        for r, p, eta in reversed(etas):
+            y[r] = (y[r] - sum(y[i]*d for i, d in eta))/p
+        return y
+
+    def _column(self, c):
+        'the tableau column c, kept until the next pivot.'
+        if self._entering[0] != c:
+            self._entering = (c, self._ftran(self.A[c]))
+        return self._entering[1]
+
+    def _sigma(self):
+        xb, cost = self.xb, self.cost
+        if self._sigma_row is None:
+            y = self._duals()
+            self._sigma_row = [cost[j] - sum(y[i]*v for i, v in a)
+                               for j, a in enumerate(self.A)]
+        sigma = self._sigma_row #the RHS may have been changed
+        sigma[0] = cost[0] - sum(cost[b]*x for b, x in zip(self.base, xb) if b)
+        return sigma
+
+    def _duals(self):
+        'cost of the base times B^{-1}, kept until the next pivot.'
+        if self._y is None:
+            self._y = self._btran([self.cost[b] for b in self.base])
+        return self._y
+
+    def _sigmas(self, cols):
+        'priced one by one, sigma is not computed for all columns.'
+        if self._sigma_row is not None:
+            return Tableau._sigmas(self, cols)
+        y, cost, A = self._duals(), self.cost, self.A
+        return [cost[j] - sum(y[i]*v for i, v in A[j]) for j in cols]
+
+    def _row(self, r):
+        return self._sigma() if r == 0 else self._views[r]
+
+    def _entry(self, r, c):
+        'r>0: the RHS is the value of the basic variable.'
+        if c == 0: return self.xb[r]
+        col, d = self._entering
+        if c == col: return d[r]
+        return self._full_row(r)[c]
+
+    def _set_entry(self, r, c, v):
+        assert c == 0, "Only the RHS may be changed!"
+        self.xb[r] = v
+
+    def _full_row(self, r):
+        row = self._row_cache.get(r)
+        if row is None:
+            e = [0]*(self.m+1)
+            e[r] = 1
+            rho = self._btran(e)
+            row = [sum(rho[i]*v for i, v in a) for a in self.A]
+            self._row_cache[r] = row
+        row[0] = self.xb[r]
+        return row
+
+    def _pivot(self, row, col, hist=True):
+        self._pre_pivot(row, col, hist)
+        d = self._column(col)
+        p = d[row]
+        eta = [(i, v) for i, v in enumerate(d) if v and i and i != row]
+        self.etas.append((row, p, eta))
+        xb = self.xb
+        xb[row] = t = xb[row]/p
+        if t:
+            for i, v in eta: xb[i] -= v*t
+        if hist: self.hist.append((self.base[row], col))
+        self._set_basic(row, col) #must go after history update
+        self._clear()
+        if len(self.etas) >= self.refactor: self._refactor()
+
+    def _refactor(self):
+        'rebuild F and P from the basic columns, see the class.'
+        self.factor, self.perm, self.etas = [], None, []
+        #rows whose unit column has left the base
+        free = set(r for r in range(1, self.m+1)
+                   if self.unit[r] not in self.baserow)
+        perm = [0]*(self.m+1)
+        for r, b in enumerate(self.base):
+            if not r: continue
+            if b in self.unitrow: #column I[f] is not touched by F
+                perm[r] = self.unitrow[b]
+                continue
+            d = self._ftran(self.A[b])
+            if r in free and d[r]: f = r
+            else: f = max(sorted(free), key=lambda i: abs(d[i]))
+            free.remove(f) #d[f] is not zero
+            perm[r] = f
+            self.factor.append((f, d[f],
+                [(i, v) for i, v in enumerate(d) if v and i and i != f]))
+        if perm != list(range(self.m+1)): self.perm = perm
+        self._clear()
+
+    def _pivot_row(self, col):
+        self._column(col) #the ratio test reads the entering column
+        return Tableau._pivot_row(self, col)
+
+    def _lex_row(self, col, ties):
+        'rows of B^{-1} by btran, the unit columns of row j are e_j.'
+        d, keys = self._column(col), {}
+        for i in ties:
+            e = [0]*(self.m+1)
+            e[i] = 1
+            keys[i] = [v/d[i] for v in self._btran(e)[1:]]
+        return min(ties, key=keys.get)
+
+    def _kappa(self, col):
+        y = self._btran(self._column(col)[:]) #column col times B^{-1}
+        return [sum(y[i]*v for i, v in a) for a in self.A]
+
+    def _best_objective(self):
+        'a ratio test for each column, their tableau columns differ.'
+        best, idx, sigma = fract(-1), 0, self._sigma()
+        for i in range(1, self.cols):
+            if sigma[i] <= 0: continue
+            imp = self._improvement(i)
+            if imp is None: return i #infinity
+            if imp <= best: continue #infty can't be converted
+            best, idx = imp, i
+        return idx #0: reached optimality
+
+    def _improvement(self, c):
+        d, xb = self._ftran(self.A[c]), self.xb
+        ratio = [xb[i]/d[i] for i in range(1, self.m+1) if d[i]>0]
+        if len(ratio) == 0: return None #float('infinity')
+        return min(ratio)*self._sigma()[c]
+
+    def _restore_rhs(self):
+        self.xb = self._ftran(self.A[0])
+
+    def _set_b(self, b):
+        Tableau._set_b(self, b)
+        self.A[0] = [(i, fract(v)) for i, v in enumerate(b, 1) if v]
+
+    def _binv(self):
+        m = self.m
+        cols = [self._ftran([(i, fract(1))]) for i in range(1, m+1)]
+        return [[d[r] for d in cols] for r in range(1, m+1)]
+
+def lcm(a, b): return a*b//gcd(a, b)
+
+class IntegerTableau(Tableau):
+    '''Exact tableau in Python ints, with fraction-free pivots.
+Row i of origrows is scaled to integers by rs[i], and the slack,
+surplus or artificial column of row i by cs (they keep their +1/-1),
+so the initial base is I. Then T = d * B^{-1} [b A] is kept in ints,
+where d is the determinant of the (scaled) base, and a pivot on p
+is the Bareiss update (p*T[i][j] - T[i][c]*T[r][j]) / d, which
+divides exactly. The objective row has its own scale s0. The entry
+at (r, c) is T[r][c]*cs[c]/(d*rs), rs being s0 for r == 0 and
+cs[base[r]] otherwise; Fractions are made only for reports.'''
+    engine = 'integer'
+    upper_bounds = False #bounds become rows
+
+    def __init__(self, prob, interactive=True, engine=None, out=None):
+        Tableau.__init__(self, prob, interactive, out=out)
+        self.rs = [1] #row scale, the objective has s0
+        for row in self.origrows[1:]:
+            s = 1
+            for v in row:
+                if v: s = lcm(s, fract(v).denominator)
+            self.rs.append(s)
+        self.cs = [1]*len(self.vars) #column scale
+        for j, v in enumerate(self.vars):
+            if v[0] in '#$@': self.cs[j] = self.rs[int(v[1:])]
+
+    @property
+    def rows(self): return self._rows
+
+    def _init_base(self):
+        self.m = len(self.origrows)-1 #excluding objective row
+        self.b = [row[0] for row in self.origrows[1:]] #initial b
+        self.base = self.unit[:] #base[0] for the objective row
+        self._index_base()
+        self.cols = len(self.vars) #0 for RHS
+        self.T = [None] #T[0] is set by _set_objective
+        for i, row in enumerate(self.origrows):
+            if not i: continue
+            s = self.rs[i]
+            self.T.append([int(fract(v)*s/c) if v else 0
+                           for v, c in zip(row, self.cs)])
+        self.bi = [row[0] for row in self.T[1:]] #scaled b
+        self.d = 1 #the common denominator
+        self.K = 1 #extra factor in d and T, see _wolf
+        self._rows = _TableauView(self)
+        if '@' not in ''.join(v[0] for v in self.vars[1:]):
+            self.phase = 2 #no artificial variables
+            return self._set_objective(self.fobj)
+        self.phase = 1
+        self._set_objective([fract(-1) if v[0]=='@' else fract(0)
+                             for v in self.vars])
+
+    def _set_objective(self, cost):
+        cost = [fract(a)/c for a, c in zip(cost, self.cs)]
+        s0 = 1
+        for a in cost: s0 = lcm(s0, a.denominator)
+        cost = [int(a*s0) for a in cost]
+        T, sigma = self.T, [self.d*a for a in cost]
+        for r, b in enumerate(self.base):
+            e = cost[b]
+            if r == 0 or e==0: continue
+            sigma = [s-e*v for s, v in zip(sigma, T[r])]
+        T[0] = sigma
+        self.s0 = s0
+
+    def _row(self, r): return _RowView(self, r)
+
+    def _snapshot(self):
+        return ([trow[:] for trow in self.T], self.d, self.K,
+                self.base[:], set(self.flipped))
+
+    def _load(self, snap):
+        T, self.d, self.K, base, flipped = snap
+        self.T = [trow[:] for trow in T]
+        self.base, self.flipped = base[:], set(flipped)
+        self._index_base()
+
+    def _rowscale(self, r):
+        return self.s0 if r == 0 else self.cs[self.base[r]]
+
+    def _entry(self, r, c):
+        return fract(self.T[r][c]*self.cs[c], self.d*self._rowscale(r))
+
+    def _full_row(self, r):
+        d = self.d*self._rowscale(r)
+        return [fract(v*c, d) for v, c in zip(self.T[r], self.cs)]
+
+    def _set_entry(self, r, c, v):
+        v = fract(v)*self.d*self._rowscale(r)/self.cs[c]
+        assert v.denominator == 1, "Not an entry of this tableau!"
+        self.T[r][c] = v.numerator
+
+    def _pivot(self, row, col, hist=True):
+        self._pre_pivot(row, col, hist)
+        T, d = self.T, self.d
+        prow = T[row]
+        p = prow[col]
+        for r, trow in enumerate(T):
+            if r == row: continue
+            e = trow[col]
+            if e: T[r] = [(p*v-e*w)//d for v, w in zip(trow, prow)]
+            elif p != d: T[r] = [p*v//d for v in trow]
+        if p < 0: #keep d positive
+            self.T = T = [[-v for v in trow] for trow in T]
+            p = -p
+        self.d = p
+        if hist: self.hist.append((self.base[row], col))
+        self._set_basic(row, col) #must go after history update
+
+    def _largest_sigma(self):
+        best, idx, sigma, cs = 0, 0, self.T[0], self.cs
+        for i in range(1, self.cols):
+            if sigma[i] <= 0: continue
+            v = sigma[i]*cs[i] #the same scale for all columns
+            if v <= best: continue
+            best, idx = v, i
+        return idx #0: reached optimality
+
+    def _smallest_index(self):
+        sigma = self.T[0]
+        for i in range(1, self.cols):
+            if sigma[i] > 0: return i
+        return 0 #reached optimality
+
+    _auto_choice = _smallest_index
+
+    def _min_ratio(self, rows, col):
+        'row of the smallest ratio T[i][0]/T[i][col] > 0, or 0.'
+        T, ri = self.T, 0
+        for i in rows:
+            if T[i][col] <= 0: continue
+            if ri == 0 or T[i][0]*T[ri][col] < T[ri][0]*T[i][col]:
+                ri = i
+        return ri
+
+    def _best_objective(self):
+        best, idx, T = -1, 0, self.T
+        for i in range(1, self.cols):
+            if T[0][i] <= 0: continue
+            r = self._min_ratio(range(1, self.m+1), i)
+            if r == 0: return i #infinity
+            imp = fract(T[r][0]*T[0][i], T[r][i]*self.d*self.s0)
+            if imp <= best: continue
+            best, idx = imp, i
+        return idx #0: reached optimality
+
+    def _sigmas(self, cols):
+        'in the scale of T, the same for all columns.'
+        sigma, cs = self.T[0], self.cs
+        return [sigma[c]*cs[c] for c in cols]
+
+    def _kappa(self, col):
+        'in ints, with one common denominator for the rows.'
+        T, cs, L = self.T, self.cs, 1
+        rows = [i for i in range(1, self.m+1) if T[i][col]]
+        for i in rows: L = lcm(L, cs[self.base[i]]**2)
+        kappa = [0]*len(self.vars)
+        for i in rows:
+            e = T[i][col]*L//cs[self.base[i]]**2
+            kappa = [k+e*v for k, v in zip(kappa, T[i])]
+        L *= self.d*self.d
+        return [fract(k*cs[col]*c, L) for k, c in zip(kappa, cs)]
+
+    def _pivot_row(self, col):
+        '''always use "smallest_index" to break tie.'''
+        if self.degenerated:
+            rows = self.degenerated
+            if self.out: self.out("degenerated rows:"+ repr(rows))
+        else: rows = list(range(1,self.m+1))
+        T = self.T
+        ri = self._min_ratio(rows, col)
+        if ri == 0:
+            if not self.degenerated: return 0 #infinite solution
+            #OK, we found a way out of degeneracy!
+            self._restore()
+            return self._pivot_row(col)
+
+        n, l = T[ri][0], T[ri][col] #mrat == n/l
+        ties = [i for i in rows if T[i][col] > 0
+                and T[i][0]*l == n*T[i][col]]
+        needcare = (n == 0 and len(ties) > 1)
+
+        if len(ties) > 1 and self.lexicographic:
+            return self._lex_row(col, ties)
+
+        if needcare and self.virtual_perturbation:
+            cs, idx = self.cs, 0
+            for i in ties: #smallest lhs, rows have their own scale
+                if idx == 0 or T[i][col]*cs[self.base[idx]] <\
+                   T[idx][col]*cs[self.base[i]]:
+                    idx = i
+            return idx #which has lmin, to break cycle
+
+        if needcare and self.flat_wolf:
+            if not self.degenerated:
+                self.vobj = self.rows[0][0] #remember objective value
+                self.degenerated = [i for i in rows if T[i][0]==0]
+            self._wolf()
+            return self._pivot_row(col)
+
+        return min(ties, key=lambda i: self.base[i]) #smallest_index
+
+    def _lex_row(self, col, ties):
+        'on T: the scale of a row cancels in its quotients.'
+        T = self.T
+        for k in self.unit[1:]:
+            if len(ties) < 2: break
+            q = [fract(T[i][k], T[i][col]) for i in ties]
+            m = min(q)
+            ties = [i for i, v in zip(ties, q) if v == m]
+        return ties[0]
+
+    def _wolf(self):
+        '''wolf randomization, the same draws as Tableau._pivot_row.
+A RHS of 1/q needs d*cs/q in T, so T and d are scaled by the lcm
+of the q's first. The pivots still divide exactly, and _restore
+takes the factor K out again.'''
+        zeros = [i for i in self.degenerated if self.T[i][0] == 0]
+        draws = [randint(2,10) for i in zeros]
+        L = 1
+        for q in draws: L = lcm(L, q)
+        if L > 1:
+            self.T = [[v*L for v in trow] for trow in self.T]
+            self.d *= L
+            self.K *= L
+        for i, q in zip(zeros, draws):
+            self.T[i][0] = self.d*self.cs[self.base[i]]//q
+
+    def _restore(self):
+        Tableau._restore(self)
+        K, self.K = self.K, 1
+        if K == 1: return
+        self.T = [[v//K for v in trow] for trow in self.T]
+        self.d //= K
+
+    def _set_b(self, b):
+        'ValueError if b needs other row scales than those of T.'
+        bi = [fract(v)*s for v, s in zip(b, self.rs[1:])]
+        if any(v.denominator != 1 for v in bi):
+            raise ValueError("b is not a multiple of 1/rs")
+        Tableau._set_b(self, b)
+        self.bi = [v.numerator for v in bi]
+
+    def _restore_rhs(self):
+        unit, bi = self.unit[1:], self.bi
+        for trow in self.T[1:]:
+            trow[0] = sum(b*trow[k] for b, k in zip(bi, unit))
+
+Tableau.engines['fraction'] = Tableau
+Tableau.engines['float'] = FloatTableau
+Tableau.engines['hybrid'] = HybridTableau
+Tableau.engines['revised'] = RevisedTableau
+Tableau.engines['sparse'] = SparseTableau
+Tableau.engines['integer'] = IntegerTableau
+
+class Presolve(object):
+    '''Reductions of a model before it goes to Tableau. A row of the
+same terms as another (up to a factor) gives way to the tighter one,
+a row the bounds of its variables always satisfy is dropped, a row of
+one variable becomes a bound, a fixed variable, or one left in no
+row, is substituted out. It solves and reports like a Tableau, on
+the rows and variables of prob; the tableau of the reduced model is
+self.tab. The engine must keep upper bounds out of the matrix.'''
+    def __init__(self, prob, interactive=True, engine=None, out=None):
+        self.out = Output() if out is None else out
+        self.prob = prob
+        if not self._reduce():
+            self.out("Presolve: the model is infeasible, kept as it is.")
+            self._reduce(False)
+        if self.dropped or self.fixed:
+            self.out("Presolve: %i rows and %i columns removed."
+                     %(len(self.dropped), len(self.fixed)))
+        self.tab = Tableau(self.reduced, interactive, engine, out=self.out)
+        assert self.tab.upper_bounds, "Can't presolve!"
+        self.infty = self.tab.infty
+
+    def _reduce(self, reduce=True):
+        '''the reductions, over and over until none applies. False if
+infeasible, reduce=False keeps the model as it is.'''
+        prob = self.prob
+        def terms(td):
+            return dict((v, c if type(c) is fract else fract(c))
+                        for v, c in td.items())
+        self.sts = sts = [(terms(t), r, fract(b)) for t, r, b, p in prob.sts]
+        cost, self.dir = sts[0][0], sts[0][1]
+        rows = dict((i, [dict(t), r, b]) for i, (t, r, b) in enumerate(sts))
+        del rows[0]
+        cols = {} #var: the rows it is in
+        for i in rows:
+            for v in rows[i][0]: cols.setdefault(v, set()).add(i)
+        free = prob.fvset
+        #bounds of the variables and their rows, None if declared
+        self.lower, self.upper = lower, upper = {}, {}
+        for v in (set(cols) | set(cost) | set(prob.vars)) - free:
+            l, u = prob.bounds.get(v, (None, None))
+            lower[v], upper[v] = (l or fract(0), None), (u, None)
+        self.fixed = {} #removed variable: its value
+        self.dropped = {} #removed row: why
+        self.order = [] #the removed variables in turn
+        konst, changed = 0, reduce
+        while changed:
+            changed = False
+            #a row of one variable is a bound, a row of none is checked
+            for i in [i for i in rows if len(rows[i][0]) < 2]:
+                t, r, b = rows[i]
+                if not t:
+                    if b*r < 0 or r == 0 and b: return False
+                    del rows[i]
+                    self.dropped[i] = 'empty'
+                    continue
+                (v, a), = t.items()
+                if v in free: continue
+                if r*a >= 0 and (upper[v][0] is None or b/a < upper[v][0]):
+                    upper[v] = b/a, i
+                if r*a <= 0 and b/a > lower[v][0]:
+                    lower[v] = b/a, i
+                u = upper[v][0]
+                if u is not None and lower[v][0] > u: return False
+                del rows[i]
+                cols[v].discard(i)
+                self.dropped[i] = 'bound'
+                changed = True
+            #fixed variables, and those in no row at their best bound
+            for v in lower:
+                if v in self.fixed: continue
+                l, u = lower[v][0], upper[v][0]
+                if cols.get(v):
+                    if l != u: continue
+                    x = l
+                elif self.dir*cost.get(v, 0) > 0:
+                    if u is None: continue #unbounded, for the simplex
+                    x = u
+                else: x = l
+                for i in cols.pop(v, ()):
+                    rows[i][2] -= rows[i][0].pop(v)*x
+                konst += cost.get(v, 0)*x
+                self.fixed[v] = x
+                self.order.append(v)
+                changed = True
+            #rows of the same terms, up to a factor: the tightest stays
+            groups = {}
+            for i in sorted(rows):
+                t = rows[i][0]
+                if not t: continue
+                vs = sorted(t)
+                key = tuple((v, t[v]/t[vs[0]]) for v in vs)
+                groups.setdefault(key, []).append((i, t[vs[0]]))
+            for ids in groups.values():
+                if len(ids) < 2: continue
+                #a*e r b as e r' b/a, e with 1 as its first coefficient
+                es = [(i, rows[i][1]*(1 if a > 0 else -1), rows[i][2]/a)
+                      for i, a in ids]
+                eqs = [e for e in es if e[1] == 0]
+                ups = [e for e in es if e[1] > 0]
+                los = [e for e in es if e[1] < 0]
+                if eqs:
+                    up = lo = eqs[0]
+                    if any(e[2] != up[2] for e in eqs) or\
+                       any(e[2] < up[2] for e in ups) or\
+                       any(e[2] > up[2] for e in los): return False
+                else:
+                    up = min(ups, key=lambda e: e[2]) if ups else None
+                    lo = max(los, key=lambda e: e[2]) if los else None
+                    if up and lo and lo[2] > up[2]: return False
+                for i, r, beta in es:
+                    if i in (up and up[0], lo and lo[0]): continue
+                    for v in rows[i][0]: cols[v].discard(i)
+                    del rows[i]
+                    self.dropped[i] = 'duplicate'
+                    changed = True
+            #rows that no values within the bounds can break
+            for i in list(rows):
+                t, r, b = rows[i]
+                if r == 0: continue
+                act = 0
+                for v, a in t.items():
+                    x = (upper if a*r > 0 else lower).get(v)
+                    if not x or x[0] is None: break
+                    act += a*x[0]
+                else:
+                    if (act - b)*r > 0: continue
+                    for v in t: cols[v].discard(i)
+                    del rows[i]
+                    self.dropped[i] = 'redundant'
+                    changed = True
+        #the reduced model
+        self.rowmap = sorted(rows) #reduced row k is row rowmap[k-1]
+        red = LPParser(out=self.out)
+        red.sts = [(dict((v, c) for v, c in cost.items()
+                         if v not in self.fixed),
+                    self.dir, sts[0][2]-konst, prob.sts[0][3])]
+        for i in self.rowmap:
+            t, r, b = rows[i]
+            red.sts.append((t, r, b, prob.sts[i][3] or '%i)'%i))
+        used = set()
+        for t, r, b, p in red.sts: used.update(t)
+        red.vars = prob.sortvars(list(used))
+        red.fvs = [v for v in prob.fvs or [] if v in used]
+        red.intvars = [v for v in prob.intvars if v in used]
+        red.fvset, red.intset = set(red.fvs), set(red.intvars)
+        red.bounds = dict((v, [lower[v][0], upper[v][0]]) for v in used
+                          if v in lower and
+                          (lower[v][0] or upper[v][0] is not None))
+        self.reduced = red
+        #the variables of prob, as Tableau has them
+        used = set(cost) | set(prob.vars)
+        for t, r, b in sts: used.update(t)
+        self.vars = prob.sortvars(list(used) +
+                                  ['!'+v for v in used if v in free])
+        return True
+
+    def solve(self, maxit=-1, save=True):
+        return self.tab.solve(maxit, save)
+
+    def getObj(self): return self.tab.getObj()
+    def getSolution(self):
+        x = dict(self.tab.getSolution())
+        x.update(self.fixed)
+        return [('(Obj)', self.getObj())] +\
+               [(v, x[v]) for v in self.vars if v[0] != '!']
+
+    def _sign(self, t, b, bounds):
+        '-1 if Tableau negates the row: b < 0 with the lower bounds in.'
+        for v, a in t.items():
+            if v in bounds: b -= a*(bounds[v][0] or 0)
+        return -1 if b < 0 else 1
+
+    def sensit(self):
+        '''sensitivity of the reduced tableau, mapped to the rows and
+variables of prob. The reductions are undone in reverse: a variable
+at a bound made from a row is basic with it, the row takes over its
+reduced cost as dual price.'''
+        tab, dr, sts = self.tab, self.dir, self.sts
+        tab.sensit()
+        self.col = col = tab.col
+        self.binv = tab._binv()
+        #columns of prob, with the negative parts of free variables
+        self.cols0, self.cost = {}, dict(sts[0][0])
+        for i, (t, r, b) in enumerate(sts):
+            for v, a in t.items():
+                if i: self.cols0.setdefault(v, []).append((i, a))
+                if v not in self.prob.fvset: continue
+                if i: self.cols0.setdefault('!'+v, []).append((i, -a))
+                else: self.cost['!'+v] = -a
+        #pi: d obj / d b of the rows as given, g: d obj / d x
+        pi = [0]*len(sts)
+        self.kmap, self.ksign = {}, [1] #reduced rows, negated in tab?
+        for k, i in enumerate(self.rowmap):
+            t, r, b, p = self.reduced.sts[k+1]
+            self.ksign.append(self._sign(t, b, self.reduced.bounds))
+            self.kmap[i] = k+1
+            pi[i] = self.ksign[-1]*tab.shadow[k]
+        g, self.src, self.atub = {}, {}, {}
+        for v in self.vars:
+            j = col.get(v)
+            if j is None or j in tab.baserow: continue
+            g[v] = dr*tab.rows[0][j]
+            if j in tab.flipped: g[v] = -g[v]
+            if v in self.lower:
+                bound = self.upper if j in tab.flipped else self.lower
+                self.src[v] = bound[v][1]
+            if not self.src.get(v): self.atub[v] = j in tab.flipped
+        self.ksrc = [v for v in self.src if self.src[v]]
+        self._dual(pi, g, self.cost)
+        for v in self.order:
+            l, u = self.prob.bounds.get(v, (None, None))
+            if self.src[v] or u is not None and (l or 0) == u: continue
+            self.atub[v] = self.fixed[v] == u
+        self.pi, self.g = pi, g
+        self.d = dict((v, -dr*g[v]) for v in g)
+        self.active = dict((self.src[v], v) for v in self.src if self.src[v])
+        self.forward = [v for v in self.order if self.src[v]] + self.ksrc
+        self.tight = [i for i in self.active if sts[i][1]] +\
+                     [i for i, k in self.kmap.items() if sts[i][1] and
+                      tab.slackcol[k] not in tab.baserow]
+        self.x = x = dict(tab.getSolution())
+        x.update(self.fixed)
+        self.sign = [self._sign(t, b, self.prob.bounds) for t, r, b in sts]
+        self.shadow = [s*y for s, y in zip(self.sign, pi)][1:]
+        self.slack = [r*(b - sum(a*x[v] for v, a in t.items()))
+                      for t, r, b in sts[1:]]
+        self.bl, self.rhs, self.bu = [], [], []
+        for i, (t, r, b) in enumerate(sts):
+            if not i: continue
+            lo, hi = self._rhs_range(i)
+            lo = None if lo is None else b + lo
+            hi = None if hi is None else b + hi
+            if self.sign[i] < 0:
+                lo, hi = hi if hi is None else -hi, lo if lo is None else -lo
+                b = -b
+            self.bl.append(self.infty if lo is None else lo)
+            self.rhs.append(b)
+            self.bu.append(self.infty if hi is None else hi)
+
+    def _dual(self, pi, g, cost):
+        '''pi of the rows made bounds and g of the removed variables,
+given those of the reduced tableau, in the reverse of the order
+they were removed in. A variable basic with its row gives it its g.'''
+        for v in self.ksrc:
+            i = self.src[v]
+            pi[i], g[v] = g.get(v, 0)/self.sts[i][0][v], 0
+        for v in reversed(self.order):
+            g[v] = cost.get(v, fract(0)) - sum(pi[i]*a for i, a
+                                        in self.cols0.get(v, ()))
+            if v not in self.src: #at the bound it goes for
+                bound = self.upper if self.dir*g[v] > 0 else self.lower
+                self.src[v] = bound[v][1]
+            i = self.src[v]
+            if i: pi[i], g[v] = g[v]/self.sts[i][0][v], 0
+
+    def _rhs_range(self, i):
+        '''(lower, upper) of the change of b[i] with the same base: the
+variables move along, the rows and bounds of prob stop them.'''
+        tab, sts, tol = self.tab, self.sts, self.tab.feas_tol
+        dx, delta = {}, {} #delta: of the RHS of the reduced rows
+        if i in self.active:
+            v = self.active[i]
+            dx[v] = 1/sts[i][0][v]
+        elif i in self.kmap: delta[i] = 1
+        for w in self.forward: #bounds made of rows of moved variables
+            j = self.src[w]
+            s = sum(a*dx[z] for z, a in sts[j][0].items()
+                    if z in dx and z != w)
+            if s: dx[w] = -s/sts[j][0][w]
+        for w, d in dx.items():
+            for k, a in self.cols0.get(w, ()):
+                if k in self.kmap: delta[k] = delta.get(k, 0) - a*d
+        for r, bi in enumerate(self.binv if delta else ()):
+            c = sum(bi[self.kmap[k]-1]*self.ksign[self.kmap[k]]*e
+                    for k, e in delta.items())
+            j = tab.base[r+1]
+            if not c or tab.vars[j][0] in '#$@': continue
+            dx[tab.vars[j]] = -c if j in tab.flipped else c
+        act = {}
+        for w, d in dx.items():
+            for k, a in self.cols0.get(w, ()): act[k] = act.get(k, 0) + a*d
+        lo, hi = [], []
+        for k in set(act) | set([i]):
+            r = sts[k][1]
+            e = r*((k == i) - act.get(k, 0)) #of the slack
+            if r and abs(e) > tol:
+                (lo if e > 0 else hi).append(-self.slack[k-1]/e)
+        for w, d in dx.items():
+            if w not in self.lower or abs(d) <= tol: continue
+            l, u = self.prob.bounds.get(w, (None, None))
+            x = self.x[w]
+            (lo if d > 0 else hi).append(((l or 0) - x)/d)
+            if u is not None: (hi if d > 0 else lo).append((u - x)/d)
+        return max(lo) if lo else None, min(hi) if hi else None
+
+    def getCoefRange(self, v):
+        '''as Tableau.getCoefRange, by name: how far the cost of v may
+go with the same base, the reduced costs and dual prices move along.'''
+        tab, sts, dr, tol = self.tab, self.sts, self.dir, self.tab.feas_tol
+        dpi, dg = [0]*len(sts), {}
+        j = self.col.get(v)
+        if v not in self.fixed and j in tab.baserow:
+            r = tab.baserow[j] - 1
+            s = -1 if j in tab.flipped else 1
+            for i, k in self.kmap.items():
+                dpi[i] = s*self.ksign[k]*self.binv[r][k-1]
+        for i in range(1, len(sts)):
+            if not dpi[i]: continue
+            for w, a in sts[i][0].items():
+                dg[w] = dg.get(w, 0) - dpi[i]*a
+                if w in self.prob.fvset:
+                    dg['!'+w] = dg.get('!'+w, 0) + dpi[i]*a
+        if v in self.g and v not in self.fixed: dg[v] = dg.get(v, 0) + 1
+        self._dual(dpi, dg, {v: fract(1)})
+        lo, hi = [], []
+        def keep(x, e, s): #s*(x + e*t) >= 0
+            if abs(e) > tol: (lo if s*e > 0 else hi).append(-x/e)
+        for w in self.atub:
+            keep(self.g[w], dg.get(w, 0), dr if self.atub[w] else -dr)
+        for i in self.tight:
+            keep(self.pi[i], dpi[i], dr*sts[i][1])
+        c, infty = self.cost.get(v, fract(0)), self.infty
+        return (c + max(lo) if lo else infty, c,
+                c + min(hi) if hi else infty)
+
+    def report(self):
+        if self.tab.phase != 2: return self.tab.report()
+        self.sensit()
+        self.printSoln()
+        self.printCons()
+        if 'n' in input("Sensitivity Report?[y]/n"):
+            pass
+        else:
+            self.printCoefRange()
+            self.printConsRange()
+        self.tab.savework()
+
+    def printSoln(self, tpl="%s\t\t%s\t\t%s"):
+        self.out("Optimal objective value: %s"%str(self.getObj()))
+        self.out("Optimal Solution:")
+        self.out("Variable\tActivity\tReduced Cost")
+        for v in self.vars:
+            if v in self.fixed: a = self.fixed[v]
+            else: a = self.tab._activity(self.col[v])
+            self.out(tpl%(v, a, self.d.get(v, 0)))
+
+    def printCoefRange(self, tpl="%s\t\t%s\t\t%s\t\t%s"):
+        self.out("Sensitivity on coefficients:")
+        self.out("Variable\tLower Bound\tCoefficient\tUpper Bound")
+        for v in self.vars:
+            l, a, u = self.getCoefRange(v)
+            self.out(tpl%(v, l, a, u))
+
+    def printCons(self, tpl="%s\t%s\t\t%s"): #constraints
+        self.out("Constraint Activities:")
+        self.out("ID\tSlack/Surplus\tShadow Price")
+        for i, (s, y) in enumerate(zip(self.slack, self.shadow)):
+            rname = self.prob.sts[i+1][3]
+            self.out(tpl%(rname if rname else i+1, s, y))
+
+    def printConsRange(self, tpl="%s\t%s\t\t%s\t\t%s"): #constraints
+        self.out("Sensitivity on R.H.S.:")
+        self.out("ID\tLower Bound\tCurrent Value\tUpper Bound")
+        for i in range(len(self.rhs)):
+            rname = self.prob.sts[i+1][3]
+            self.out(tpl%(rname if rname else i+1,
+                self.bl[i], self.rhs[i], self.bu[i]))
 
 class Node:
     offinc = "   "
     verbose = False
-    def __init__(self, noid, prob, note, parent=None):
+    meth = 'largest_sigma' #pricing of the tableaux, see Tableau.meth
+    def __init__(self, noid, prob, note, parent=None, bound=None, out=None,
+                 probe=None):
+        '''bound: (var, lower, upper) of the branch, None is no bound;
+the node then starts from the optimal tableau of its parent, see
+Tableau.branch.
+out: the output sink, the parent's by default.
+probe: a Probe of the node and its tableau, the parent's by default.'''
+        if out is None: out = parent.out if parent else Output()
+        if probe is None and parent: probe = parent.probe
+        self.out, self.probe = out, probe
         self.parent = parent
         self.noid = noid
         self.note = note
-        for b in reversed(self.bounds()):
-            prob.parseLine(b)
-        puts(repr(prob))
-        tab = Tableau(prob, self.verbose)
-        if tab.solve(): soln=tab.getSolution()
-        else: soln = None
-        self.soln = soln
+        self.bound = bound
         self.left = self.right = None
+        self.tab = self.soln = None
+        if prob is None: return #solved elsewhere, see BnBsolver.drill
+        start = clock()
+        tab = parent and parent.tab
+        var = bound and bound[0]
+        saved = prob.bounds, prob.sts
+        prob.bounds = dict((v, lu[:]) for v, lu in prob.bounds.items())
+        try:
+            if not _set_bounds(prob, self.bounds()): tab = None
+            elif tab is None or var is None or var in prob.fvset\
+               or not tab.upper_bounds: #solve from scratch
+                self.out(repr(prob))
+                tab = Tableau(prob, self.verbose, out=out)
+                tab.meth, tab.probe = self.meth, probe
+                tab.solve(save=False) #see BnBsolver.savework
+            else:
+                self.out("%s: warm start from [%i]"%(note, parent.noid))
+                l, u = prob.bounds[var]
+                tab = tab.branch(var, l, u)
+        finally:
+            prob.bounds, prob.sts = saved
+        #dropped once the children are made, or the work is saved
+        self.tab = tab
+        self.soln = tab.getSolution() if tab and tab.phase == 2 else None
+        if probe: probe.node(self, clock() - start)
 
     def bounds(self):
+        'the (var, lower, upper) of the branches down to the node.'
         bounds = []
         while self.parent:
-            bounds.append(self.note)
+            bounds.append(self.bound)
             self = self.parent
         return bounds
 
@@ -928,7 +3455,7 @@ class Node:
         if self.soln:
             soln = [v+':'+str(f) for v, f in self.soln]
         else: soln = ("Infeasible",)
-        puts(offset+("[%i]"%self.noid)
+        self.out(offset+("[%i]"%self.noid)
               +self.note+": "+','.join(soln))
         if not self.left: return
         offset += self.offinc
@@ -939,16 +3466,25 @@ class BnBsolver:
     '''branch and bound solver for IP.
 It prints out current BnB tree and asks for user input.'''
 
-    def __init__(self, prob):
-        self.root = Node(0, prob, "root")
+    def __init__(self, prob, out=None, probe=None):
+        '''out: the output sink, see Output.
+probe: a Probe of all the nodes, see stats.'''
+        self.out = Output() if out is None else out
+        self.probe = probe
+        self.root = Node(0, prob, "root", out=self.out, probe=probe)
         self.nodes = [self.root]
         self.prob = prob #the problem
-        self.morig = len(prob.sts) - 1 #original m
         if self.root.soln:
             self.vars = [v for v,s in self.root.soln]
         else: self.vars = None
+        #position of each variable in the solutions
+        self.col = dict((v, i) for i, v in enumerate(self.vars or ()))
         self.intvars = prob.intvars
 
+    @property
+    def stats(self):
+        'what the probe collected, see Probe.stats; None without one.'
+        return self.probe.stats() if self.probe else None
 
     def chooseNode(self):
         for i, node in enumerate(self.nodes):
@@ -969,17 +3505,17 @@ It prints out current BnB tree and asks for user input.'''
             if c>=0:
                 node = self.nodes[c]
                 if node.left or node.soln is None:
-                    puts("Bad choice! ", end='')
+                    self.out("Bad choice! ", end='')
                     continue
             else: #auto
                 c  = self.chooseNode()
-                puts("Chosen [%s]."%c)
+                self.out("Chosen [%s]."%c)
             return c
 
     def chooseVar(self, c):
         node = self.nodes[c]
         for v in self.intvars:
-            vi = self.vars.index(v)
+            vi = self.col[v]
             val  = node.soln[vi][1]
             if val.denominator == 1: continue
             return vi
@@ -988,53 +3524,165 @@ It prints out current BnB tree and asks for user input.'''
     def askVar(self, c):
         node = self.nodes[c]
         while True:
-            puts(self.intvars)
+            self.out(self.intvars)
             v = checkask("Choose variable [auto]:", '', self.intvars)
             if v:
-                vi = self.vars.index(v)
+                vi = self.col[v]
                 val = node.soln[vi][1]
                 if val.denominator == 1:
-                    puts("Bad choice! ", end='')
+                    self.out("Bad choice! ", end='')
                     continue
             else:
                 vi  = self.chooseVar(c)
-                if vi: puts("Chosen '%s'. "%self.vars[vi])
+                if vi: self.out("Chosen '%s'. "%self.vars[vi])
             return vi
             
     def interact(self):
-        puts("Current B&B tree:")
+        self.out("Current B&B tree:")
         self.root.pprint("")
         c = self.askNode()
         if c is None: return c,c
         v = self.askVar(c)
         return c, v
 
-    def drill(self, c, v):
-        'drill down node c, with variable v'
+    def drill(self, c, v, pool=None):
+        '''drill down node c, with variable v.
+With a process pool, the children are left unsolved and
+the futures of their solutions are returned.'''
         node = self.nodes[c]
         assert not node.left and node.soln, "Bad node!"
         s = node.soln[v][1]
         assert s.denominator!=1, "Bad variable!"
-        vname, prob, left = self.vars[v], self.prob, int(s)
+        vname, left = self.vars[v], s.numerator//s.denominator #floor
+        prob = self.prob if pool is None else None
         note = "%s <= %i"%(vname, left)
-        del self.prob.sts[self.morig+1:] # remove non-original
-        node.left = Node(len(self.nodes), prob, note, node)
+        node.left = Node(len(self.nodes), prob, note, node,
+                         (vname, None, left))
         self.nodes.append(node.left)
         note = "%s >= %i"%(vname, left+1)
-        del self.prob.sts[self.morig+1:] # remove non-original
-        node.right = Node(len(self.nodes), prob, note, node)
+        node.right = Node(len(self.nodes), prob, note, node,
+                          (vname, left+1, None))
         self.nodes.append(node.right)
+        node.tab = None #not needed any more
+        if pool is None: return []
+        return [(child, pool.submit(_solve_node, self.model, child.bounds()))
+                for child in (node.left, node.right)]
+
+    def savework(self, node):
+        '''offer to save the work of a node with no solution, see
+Tableau.savework. Only the interactive solve asks.'''
+        if node.soln is not None or node.tab is None: return
+        node.tab.savework()
+        node.tab = None
 
     def solve(self):
+        self.savework(self.root)
         while input("Continue? [y]/n") in 'yY':
             c, v = self.interact()
             if c is None:
-                puts("All nodes explored!")
+                self.out("All nodes explored!")
                 break
             if v is None:
                 #self.foundIntSoln(c)
                 continue
             self.drill(c,v)
+            self.savework(self.nodes[c].left)
+            self.savework(self.nodes[c].right)
+
+    strategies = ('best_first', 'depth_first', 'hybrid')
+
+    def optimize(self, strategy='best_first', maxnodes=-1, workers=0):
+        '''solve without asking. Open nodes are kept in a heap,
+best_first: by their LP bound, depth_first: the deepest first,
+hybrid: depth first until an integer solution is found.
+Nodes that can't beat the incumbent (the best integer solution
+so far) are pruned. Returns the incumbent node, None if none.
+workers: size of a process pool to solve the nodes in, up to
+that many nodes are drilled at a time.'''
+        if strategy not in self.strategies:
+            raise ValueError("unknown strategy: "+strategy)
+        if workers:
+            from concurrent.futures import ProcessPoolExecutor #Python 3
+            self.model = self.prob.compile() #sent to the workers
+            with ProcessPoolExecutor(workers) as pool:
+                return self._optimize(strategy, maxnodes, workers, pool)
+        return self._optimize(strategy, maxnodes, 1)
+
+    def _optimize(self, strategy, maxnodes, batch, pool=None):
+        sense = self.prob.sts[0][1] #max: 1, min: -1
+        self.incumbent = None
+        def key(c): #smaller first
+            node = self.nodes[c]
+            bound = -sense*node.soln[0][1]
+            if strategy == 'best_first' or strategy == 'hybrid'\
+               and self.incumbent:
+                return bound, c
+            return -len(node.bounds()), bound, c
+        heap = [key(0)] if self.root.soln else []
+        while heap and maxnodes:
+            children = []
+            while heap and maxnodes and len(children) < 2*batch:
+                c = heappop(heap)[-1]
+                node = self.nodes[c]
+                if self.incumbent and -sense*node.soln[0][1] >=\
+                   -sense*self.incumbent.soln[0][1]:
+                    if self.probe: self.probe.count('pruned')
+                    continue #pruned by bound
+                v = self.chooseVar(c)
+                if v is None: #integer solution
+                    switch = strategy == 'hybrid' and not self.incumbent
+                    self.incumbent = node
+                    if self.probe: self.probe.count('incumbents')
+                    self.out("Incumbent [%i]: %s"%(c, node.soln[0][1]))
+                    if switch: #now best first
+                        heap = [key(k[-1]) for k in heap]
+                        heapify(heap)
+                    continue
+                futures = self.drill(c, v, pool)
+                children.extend(futures or [(node.left, None),
+                                            (node.right, None)])
+                maxnodes -= 1
+            for child, future in children:
+                if future:
+                    child.soln = future.result()
+                    if self.probe: self.probe.count('nodes')
+                if child.soln: heappush(heap, key(child.noid))
+                else: child.tab = None #no solution, nothing to save
+        if heap: self.out("Hit max nodes!")
+        elif self.incumbent is None: self.out("No integer solution!")
+        return self.incumbent
+
+def _solve_scenarios(model, engine, bs, cs):
+    '''Tableau.solve_scenarios for a run of the scenarios, in a worker
+process. model: see LPParser.compile.'''
+    out = NullOutput()
+    tab = Tableau(LPParser.fromcompiled(model, out), False, engine, out=out)
+    return tab.solve_scenarios(bs, cs)
+
+def _set_bounds(prob, bounds):
+    '''tighten the bounds of prob by those of a node, see Node.bounds;
+a free variable gets rows instead, a bound would only hold one of
+its two parts. False if a variable is left with no value.'''
+    rows = []
+    for v, l, u in reversed(bounds):
+        if v in prob.fvset:
+            if l is not None: rows.append(({v: 1}, -1, l, ''))
+            if u is not None: rows.append(({v: 1}, 1, u, ''))
+            continue
+        try: prob.setbound(v, l, u)
+        except AssertionError: #empty bounds
+            return False
+    if rows: prob.sts = prob.sts + rows #a new list, prob.sts is shared
+    return True
+
+def _solve_node(model, bounds):
+    '''solution of the LP relaxation with bounds, in a worker process.
+model: see LPParser.compile.'''
+    out = NullOutput()
+    prob = LPParser.fromcompiled(model, out)
+    if not _set_bounds(prob, bounds): return None
+    tab = Tableau(prob, False, out=out)
+    return tab.getSolution() if tab.solve(save=False) else None
 
 exlp=("""
     max 6x + 4y + Z2 + Z1
@@ -1117,6 +3765,10 @@ end
 
 def main():
     global solver
+    puts('''
+Welcome to simplex tableaux!
+To abort ANYTIME, use "ctrl+C".
+''')
     while True:
         s = input("""
               ***  Menu  ***
@@ -1161,13 +3813,17 @@ Hit 'enter/return' to continue...""")
   A special constraint begins with 'free:', 'int:', or 'bin:',
   followed by a list of variables of the indicated kind:
      free: x, y #x, y are free. int: integral, bin: binary
+  Simple bounds on variables are listed after 'bounds:':
+     bounds: x <= 4, 1 <= y <= 3, z >= -2
   A variable is non-negative and continuous by default.
   The last line should be "end" to indicate the end of model.
+  A file ending with '.mps' is read as MPS (free format).
 
 File name [to type in a model here, hit return]:''')
         if s:
             try:
-                p = LPParser(open(s, 'rt'))
+                if s.lower().endswith('.mps'): p = MPSParser(open(s, 'rt'))
+                else: p = LPParser(open(s, 'rt'))
                 puts("The parsed model is:\n%r"%p)
                 input("hit 'return' to continue...")
                 solver = p.solver()
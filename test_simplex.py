@@ -0,0 +1,204 @@
+'''Tests of simplex.py: python -m pytest test_simplex.py
+(or python -m unittest test_simplex).'''
+
+import random, sys, unittest
+try: #writeMPS writes str
+    from StringIO import StringIO
+except ImportError: #Python 3
+    from io import StringIO
+import simplex
+from simplex import LPParser, Tableau, NullOutput, exlp
+
+
+def parse(text):
+    return LPParser(text, out=NullOutput())
+
+def solved(text, engine=None, meth='largest_sigma'):
+    'a non-interactive tableau of the model, solved.'
+    tab = Tableau(parse(text), False, engine, out=NullOutput())
+    tab.meth = meth
+    tab.solve(save=False)
+    return tab
+
+def dense(tab):
+    'the tableau as lists of floats, whatever the engine keeps.'
+    row = getattr(tab, '_row', lambda r: tab.rows[r])
+    return [[float(row(r)[j]) for j in range(len(tab.vars))]
+            for r in range(tab.m+1)]
+
+lps = [i for i, text in enumerate(exlp) if not parse(text).intvars]
+meths = [m for m in Tableau.method_names if m != 'user_choice']
+engines = [e for e in Tableau.engines if e != 'float' or simplex.numpy]
+
+
+class EngineTest(unittest.TestCase):
+    'every engine and pricing rule against the default fraction engine.'
+
+    def test_exlp(self):
+        for i in lps:
+            ref = solved(exlp[i])
+            for engine in engines:
+                for meth in meths:
+                    tab = solved(exlp[i], engine, meth)
+                    msg = (i, engine, meth)
+                    self.assertEqual(tab.phase, ref.phase, msg)
+                    if ref.phase == 2:
+                        self.assertAlmostEqual(float(tab.getObj()),
+                                               float(ref.getObj()), 6, msg)
+
+
+class HistoryTest(unittest.TestCase):
+    'goto and undo after a completed solve, over the end marks.'
+
+    def assertSame(self, a, b):
+        for x, y in zip(a, b):
+            for u, v in zip(x, y): self.assertAlmostEqual(u, v)
+
+    def test_goto_round_trip(self):
+        for engine in engines:
+            for i in lps:
+                tab = solved(exlp[i], engine)
+                end, base, n = dense(tab), tab.base[:], len(tab.hist)
+                tab.goto(0)
+                tab.goto(n, 0)
+                self.assertEqual(tab.base, base, (engine, i))
+                self.assertSame(dense(tab), end)
+
+    def test_undo_all(self):
+        for engine in engines:
+            for i in lps:
+                tab = solved(exlp[i], engine)
+                n = len(tab.hist)
+                tab.goto(0)
+                start, base = dense(tab), tab.base[:]
+                tab.goto(n, 0)
+                while tab.hist: tab.undo()
+                self.assertEqual(tab.base, base, (engine, i))
+                self.assertSame(dense(tab), start)
+
+
+class BoundsTest(unittest.TestCase):
+
+    def test_bounded_in_no_row(self):
+        'a bin: or bounded variable in no row is still a column.'
+        text = """max 3x + 2y
+st
+x + y <= 4
+x + 3y <= 6
+bin: z
+int: x
+end"""
+        best = simplex.BnBsolver(parse(text), NullOutput()).optimize()
+        self.assertEqual(dict(best.soln), {'(Obj)': 12, 'X': 4, 'Y': 0,
+                                           'Z': 0})
+        prob = parse(text.replace('bin: z', 'bounds: 1 <= z <= 2'))
+        for solver in (Tableau(prob, False, out=NullOutput()),
+                       simplex.Presolve(prob, False, out=NullOutput())):
+            solver.solve(save=False)
+            self.assertEqual(dict(solver.getSolution())['Z'], 1)
+
+
+def optimum(prob):
+    'the best objective of the model as a float, None if there is none.'
+    if prob.intvars:
+        node = simplex.BnBsolver(prob, NullOutput()).optimize()
+        return node and float(node.soln[0][1])
+    tab = Tableau(prob, False, out=NullOutput())
+    return float(tab.getObj()) if tab.solve(save=False) else None
+
+free_int = """NAME FREEINT
+ROWS
+ N obj
+ G c1
+ L c2
+COLUMNS
+ MARKER 'MARKER' 'INTORG'
+ x obj 1 c1 2
+ x c2 1
+ y obj 1 c1 1
+ y c2 -3
+ MARKER 'MARKER' 'INTEND'
+RHS
+ RHS c1 -5
+ RHS c2 7
+BOUNDS
+ MI BND x
+ UP BND x 4
+ FR BND y
+ENDATA
+"""
+
+
+class MPSTest(unittest.TestCase):
+
+    def assertOptimum(self, a, b, msg=None):
+        if a is None or b is None: self.assertEqual(a, b, msg)
+        else: self.assertAlmostEqual(a, b, 6, msg)
+
+    def test_round_trip(self):
+        'writeMPS and MPSParser keep the optimum of every exlp model.'
+        for i, text in enumerate(exlp):
+            prob = parse(text)
+            best = optimum(prob)
+            for fixed in (False, True):
+                f = StringIO()
+                prob.writeMPS(f, fixed)
+                back = simplex.MPSParser(f.getvalue(), fixed, out=NullOutput())
+                self.assertEqual(sorted(back.intvars), sorted(prob.intvars))
+                self.assertOptimum(optimum(back), best, (i, fixed))
+
+    def test_free_int(self):
+        'a free integer variable from MI is written back as LP text.'
+        prob = simplex.MPSParser(free_int, out=NullOutput())
+        self.assertEqual(optimum(prob), -3)
+        back = parse(repr(prob))
+        self.assertEqual(set(back.intvars) & back.fvset, set(['X', 'Y']))
+        self.assertEqual(optimum(back), -3)
+
+
+def knapsack(values, weights, cap):
+    return 'max %s\nst\n%s <= %s\nbin: %s\nend' % (
+        ' + '.join('%i x%i' % (v, j) for j, v in enumerate(values)),
+        ' + '.join('%i x%i' % (w, j) for j, w in enumerate(weights)), cap,
+        ', '.join('x%i' % j for j in range(len(values))))
+
+def brute_force(values, weights, cap):
+    'the best value of the knapsack over all subsets.'
+    n, best = len(values), 0
+    for s in range(2**n):
+        pick = [j for j in range(n) if s >> j & 1]
+        if sum(weights[j] for j in pick) <= cap:
+            best = max(best, sum(values[j] for j in pick))
+    return best
+
+
+class BranchAndBoundTest(unittest.TestCase):
+
+    def test_knapsacks(self):
+        rnd = random.Random(1)
+        for k in range(12):
+            n = rnd.randint(3, 7)
+            values = [rnd.randint(1, 20) for j in range(n)]
+            weights = [rnd.randint(1, 20) for j in range(n)]
+            cap = sum(weights)//2
+            best = brute_force(values, weights, cap)
+            for strategy in simplex.BnBsolver.strategies:
+                bnb = simplex.BnBsolver(parse(knapsack(values, weights, cap)),
+                                        NullOutput())
+                node = bnb.optimize(strategy)
+                self.assertEqual(node.soln[0][1], best, (k, strategy))
+
+    def test_infeasible_asks_nothing(self):
+        'optimize never offers to save, even for nodes with no solution.'
+        stdin, sys.stdin = sys.stdin, None #input() would fail
+        try:
+            for text in ('max x\nst\nx >= 3\nx <= 1\nint: x\nend',
+                         'max x\nst\n2x = 1\nint: x\nend'):
+                bnb = simplex.BnBsolver(parse(text), NullOutput())
+                self.assertIsNone(bnb.optimize())
+        finally:
+            sys.stdin = stdin
+
+
+if __name__ == '__main__':
+    unittest.main()